@@ -0,0 +1,317 @@
+import os
+import asyncio
+import math
+import threading
+import queue
+from typing import Optional
+
+import numpy as np
+
+from codes.audio_sources import AudioSource, create_audio_source
+from codes.level_meter import MIC_LEVELS
+from codes.noise_gate import StreamingNoiseGate
+
+# --- Configuration ---
+SAMPLERATE = 16000
+FRAME_MS = 20
+FRAME_SIZE = int(SAMPLERATE * FRAME_MS / 1000)
+PREROLL_MS = 500
+# Ring capacity: a full MAX_LISTEN_SECONDS utterance plus pre-roll and slack
+RING_SECONDS = 35
+# Streaming spectral gate applied in the capture path (denoised ring alongside the raw one)
+NOISE_SUPPRESSION = os.getenv("STT_NOISE_SUPPRESSION", "1") == "1"
+# Where audio comes from: "mic", "wav:<path>" or "synthetic" (see audio_sources)
+AUDIO_SOURCE = os.getenv("AUDIO_SOURCE", "mic")
+# Sources that can wait (files, synthetic) are held back once a listener is this many
+# frames behind, so a fast replay never overwrites audio that has not been read yet
+MAX_BACKLOG_FRAMES = 50
+
+
+class _FrameQueue(asyncio.Queue):
+    """asyncio.Queue that tells its subscription whenever the consumer takes a frame."""
+
+    def __init__(self, sub):
+        super().__init__()
+        self._sub = sub
+
+    def _get(self):
+        item = super()._get()
+        self._sub._taken()
+        return item
+
+
+class CaptureSubscription:
+    """A listener attached to the shared capture engine.
+
+    For every captured frame (plus the requested pre-roll) the end position
+    of that frame in the engine's ring buffer is pushed into `frames`, an
+    asyncio.Queue owned by `loop`, as `(end_pos, rms)` pairs. The audio
+    itself stays in the ring; read it with `engine.frame()` / `engine.read()`.
+    While anyone is subscribed, levels are published on level_meter.MIC_LEVELS;
+    `amplitude_queue` is only fed for legacy callers that still pass one.
+    """
+
+    def __init__(self, engine, loop: asyncio.AbstractEventLoop, amplitude_queue: Optional[queue.Queue] = None):
+        self.engine = engine
+        self.loop = loop
+        self.frames = _FrameQueue(self)
+        self.amplitude_queue = amplitude_queue
+        self.start_pos = 0
+        self.closed = False
+        self.delivered = 0
+        self.taken = 0
+
+    @property
+    def backlog(self) -> int:
+        """Frames delivered but not yet taken by the consumer."""
+        return self.delivered - self.taken
+
+    def _taken(self):
+        self.taken += 1
+        with self.engine._consumed:
+            self.engine._consumed.notify_all()
+
+    def _deliver(self, end_pos: int, rms: float):
+        # Called from the audio thread: hand the frame to the event loop,
+        # which wakes the awaiting consumer immediately.
+        self.delivered += 1
+        try:
+            self.loop.call_soon_threadsafe(self.frames.put_nowait, (end_pos, rms))
+        except RuntimeError:
+            # Loop already closed
+            self.closed = True
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.engine._detach(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AudioCaptureEngine:
+    """Single long-lived capture stream for the whole app session.
+
+    Audio comes from a pluggable AudioSource (microphone by default; a WAV
+    file or synthetic generator for headless load tests). Samples are
+    written straight from the source's callback into a
+    preallocated int16 ring buffer addressed by absolute sample position,
+    so a listen call can start with pre-roll recorded *before* it attached
+    and take its utterance out as a view (or one copy if it wraps).
+
+    With noise suppression on, every frame is also run through a streaming
+    spectral gate into a parallel float32 ring, one frame behind the raw
+    ring. The gate's noise profile is fed by listeners via `learn_noise()`
+    and survives across turns.
+
+    A source that can wait (`source.backpressure`) is held in its callback
+    while no one is listening or a listener is more than MAX_BACKLOG_FRAMES
+    behind, so replays faster than real time stay lossless.
+    """
+
+    def __init__(self, source: Optional[AudioSource] = None, samplerate=SAMPLERATE, frame_size=FRAME_SIZE,
+                 ring_seconds=RING_SECONDS, denoise=NOISE_SUPPRESSION):
+        self.source = source or create_audio_source(AUDIO_SOURCE, samplerate, frame_size)
+        self.samplerate = samplerate
+        self.frame_size = frame_size
+        self.frame_ms = frame_size * 1000 / samplerate
+        # Whole number of frames so a single frame never straddles the wrap point
+        frames = int(math.ceil(ring_seconds * samplerate / frame_size))
+        self.capacity = frames * frame_size
+        # Never let a waiting source get more than a quarter of the ring ahead of a listener
+        self.max_backlog = max(1, min(MAX_BACKLOG_FRAMES, frames // 4))
+        self._ring = np.zeros(self.capacity, dtype=np.int16)
+        self._scratch = np.zeros(frame_size, dtype=np.float32)
+        self.noise_gate = StreamingNoiseGate(frame_size) if denoise else None
+        self._clean_ring = np.zeros(self.capacity, dtype=np.float32) if denoise else None
+        self._write_pos = 0  # total samples written since the engine was created
+        self._subscribers = ()
+        self._lock = threading.Lock()
+        self._consumed = threading.Condition()
+        self._started = False
+
+    @property
+    def running(self) -> bool:
+        return self._started and self.source.active
+
+    @property
+    def write_pos(self) -> int:
+        return self._write_pos
+
+    def start(self):
+        """Start the audio source if it is not already running."""
+        with self._lock:
+            if self._started and self.source.active:
+                return
+            # First start, or the device went away / the stream aborted: (re)open it.
+            self.source.start(self._on_audio)
+            self._started = True
+        print(f"[Capture] {type(self.source).__name__} started.")
+
+    def stop(self):
+        with self._lock:
+            started, self._started = self._started, False
+        with self._consumed:
+            self._consumed.notify_all()
+        if started:
+            try:
+                self.source.stop()
+            except Exception as e:
+                print(f"[Capture] Error closing stream: {e}")
+            print(f"[Capture] {type(self.source).__name__} stopped.")
+
+    def attach(self, amplitude_queue: Optional[queue.Queue] = None, preroll_ms: int = PREROLL_MS) -> CaptureSubscription:
+        """Subscribe to live frames, seeded with up to `preroll_ms` of history.
+
+        Must be called from the event loop that will consume the frames.
+        `sub.start_pos` is the ring position where the pre-roll begins.
+        """
+        if not self.running:
+            self.start()
+        sub = CaptureSubscription(self, asyncio.get_running_loop(), amplitude_queue)
+        preroll = int(preroll_ms / self.frame_ms) * self.frame_size
+        with self._lock:
+            end = self._write_pos
+            start = max(0, end - preroll)
+            start -= start % self.frame_size
+            sub.start_pos = start
+            for pos in range(start + self.frame_size, end + 1, self.frame_size):
+                frame = self.frame(pos)
+                sub.delivered += 1
+                sub.frames.put_nowait((pos, self._rms(frame, np.empty(len(frame), dtype=np.float32))))
+            self._subscribers = self._subscribers + (sub,)
+        with self._consumed:
+            self._consumed.notify_all()
+        return sub
+
+    def _detach(self, sub: CaptureSubscription):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not sub)
+        with self._consumed:
+            self._consumed.notify_all()
+
+    def _wait_for_listeners(self):
+        """Block the source thread until someone listens and nobody is too far behind."""
+        with self._consumed:
+            while self._started:
+                subscribers = [s for s in self._subscribers if not s.closed]
+                if subscribers and all(s.backlog <= self.max_backlog for s in subscribers):
+                    return
+                # The timeout covers a consumer whose loop went away without detaching
+                self._consumed.wait(0.1)
+
+    def frame(self, end_pos: int) -> np.ndarray:
+        """Zero-copy view of the frame that ends at `end_pos`."""
+        start = (end_pos - self.frame_size) % self.capacity
+        return self._ring[start:start + self.frame_size]
+
+    @property
+    def denoised_pos(self) -> int:
+        """End of the audio available in the denoised ring (one frame behind)."""
+        return max(0, self._write_pos - self.frame_size)
+
+    def read(self, start_pos: int, end_pos: int, denoised: bool = False) -> np.ndarray:
+        """Samples in [start_pos, end_pos): a view, or a single copy if the range wraps.
+
+        Raw audio is int16. With `denoised=True` the float32 output of the
+        noise gate is returned instead (requires noise suppression).
+        """
+        if start_pos < self._write_pos - self.capacity:
+            raise ValueError("Requested audio has already been overwritten in the ring buffer")
+        ring = self._clean_ring if denoised else self._ring
+        if ring is None:
+            raise ValueError("Noise suppression is disabled; no denoised audio available")
+        start = start_pos % self.capacity
+        length = end_pos - start_pos
+        if start + length <= self.capacity:
+            return ring[start:start + length]
+        head = self.capacity - start
+        out = np.empty(length, dtype=ring.dtype)
+        out[:head] = ring[start:]
+        out[head:] = ring[:length - head]
+        return out
+
+    def learn_noise(self, end_pos: int):
+        """Feed the analysis window ending at `end_pos` (known non-speech) to the noise profile."""
+        if self.noise_gate is None or end_pos - self.noise_gate.n_fft < self._write_pos - self.capacity:
+            return
+        window = self.read(end_pos - self.noise_gate.n_fft, end_pos)
+        self.noise_gate.learn(np.multiply(window, 1.0 / 32768.0, dtype=np.float32))
+
+    def _rms(self, frame: np.ndarray, scratch: Optional[np.ndarray] = None) -> float:
+        """RMS level of an int16 frame, normalised to 0..1.
+
+        Uses the engine's preallocated scratch buffer unless one is given
+        (the scratch belongs to the audio thread).
+        """
+        if scratch is None:
+            scratch = self._scratch[:len(frame)]
+        np.copyto(scratch, frame, casting="unsafe")
+        return math.sqrt(float(np.dot(scratch, scratch)) / max(1, len(frame))) / 32768.0
+
+    def _on_audio(self, block: np.ndarray):
+        # block is mono int16 from the source's thread; copy it straight into the ring
+        frames = len(block)
+        pos = self._write_pos % self.capacity
+        first = min(frames, self.capacity - pos)
+        self._ring[pos:pos + first] = block[:first]
+        if first < frames:
+            self._ring[:frames - first] = block[first:]
+        if self.noise_gate is not None and frames == self.frame_size:
+            # The gate emits the previous frame's output (one hop of latency)
+            np.multiply(block, 1.0 / 32768.0, out=self._scratch, casting="unsafe")
+            slot = (pos - frames) % self.capacity
+            self.noise_gate.process(self._scratch, self._clean_ring[slot:slot + frames])
+        with self._lock:
+            self._write_pos += frames
+            end_pos = self._write_pos
+            subscribers = self._subscribers
+        if subscribers:
+            amp = self._rms(block)
+            MIC_LEVELS.publish(amp)
+            for sub in subscribers:
+                sub._deliver(end_pos, amp)
+                if sub.amplitude_queue is not None:
+                    sub.amplitude_queue.put(amp)
+        if self.source.backpressure:
+            self._wait_for_listeners()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_capture_engine() -> AudioCaptureEngine:
+    """Return the process-wide capture engine (created on first use)."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AudioCaptureEngine()
+        return _engine
+
+
+def set_capture_source(source: AudioSource) -> AudioCaptureEngine:
+    """Replace the process-wide engine with one fed by `source` (e.g. for load tests)."""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.stop()
+        _engine = AudioCaptureEngine(source)
+        return _engine
+
+
+def start_capture():
+    """Start the shared capture stream; failures are logged, not raised."""
+    try:
+        get_capture_engine().start()
+    except Exception as e:
+        print(f"[Capture] Could not start microphone stream: {e}")
+
+
+def stop_capture():
+    if _engine is not None:
+        _engine.stop()
@@ -0,0 +1,232 @@
+import os
+import time
+import wave
+import threading
+from typing import Callable, Optional
+
+import numpy as np
+
+# A sink receives one block of mono int16 samples at a time
+Sink = Callable[[np.ndarray], None]
+
+
+class AudioSource:
+    """Something that produces mono int16 audio blocks for the capture engine.
+
+    `start(sink)` begins calling `sink(block)` from a background thread (or
+    the audio driver's thread) with `frame_size`-sample blocks at
+    `samplerate`; `stop()` ends it. A source with `backpressure` set may be
+    blocked inside `sink` (see AudioCaptureEngine); a live device may not.
+    """
+
+    backpressure = False
+
+    def __init__(self, samplerate: int, frame_size: int):
+        self.samplerate = samplerate
+        self.frame_size = frame_size
+
+    @property
+    def active(self) -> bool:
+        raise NotImplementedError
+
+    def start(self, sink: Sink):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+
+class SoundDeviceSource(AudioSource):
+    """Live microphone input through sounddevice / PortAudio."""
+
+    def __init__(self, samplerate: int, frame_size: int, device=None):
+        super().__init__(samplerate, frame_size)
+        self.device = device
+        self._stream = None
+
+    @property
+    def active(self) -> bool:
+        return self._stream is not None and self._stream.active
+
+    def start(self, sink: Sink):
+        # Imported lazily so headless boxes without PortAudio can use the other sources
+        import sounddevice as sd
+
+        if self._stream is not None:
+            try:
+                self._stream.close()
+            except Exception:
+                pass
+
+        def callback(indata, frames, time_info, status):
+            # indata is int16, shape (frames, 1)
+            sink(indata[:, 0])
+
+        self._stream = sd.InputStream(
+            samplerate=self.samplerate,
+            channels=1,
+            dtype="int16",
+            blocksize=self.frame_size,
+            device=self.device,
+            callback=callback,
+        )
+        self._stream.start()
+
+    def stop(self):
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            stream.stop()
+            stream.close()
+
+
+class _PacedSource(AudioSource):
+    """Base for generated sources: a thread emits frames on a real-time clock.
+
+    `speed` scales the clock (2.0 = twice real time); 0 drops the clock.
+    Either way the capture engine holds the thread back while the listener
+    lags (or nobody listens), so even speed 0 cannot overrun the ring: it
+    runs as fast as the listener consumes frames.
+    """
+
+    backpressure = True
+
+    def __init__(self, samplerate: int, frame_size: int, speed: float = 1.0):
+        super().__init__(samplerate, frame_size)
+        self.speed = speed
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _next_frame(self) -> Optional[np.ndarray]:
+        """Return the next frame_size int16 block, or None when exhausted."""
+        raise NotImplementedError
+
+    def start(self, sink: Sink):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(sink,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _run(self, sink: Sink):
+        interval = self.frame_size / self.samplerate / self.speed if self.speed > 0 else 0.0
+        deadline = time.perf_counter()
+        while not self._stop.is_set():
+            frame = self._next_frame()
+            if frame is None:
+                break
+            sink(frame)
+            if interval:
+                deadline += interval
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    self._stop.wait(delay)
+                else:
+                    deadline = time.perf_counter()
+
+
+def _read_wav(path: str, samplerate: int) -> np.ndarray:
+    """Read a PCM WAV file as mono int16 at `samplerate` (linear resampling if needed)."""
+    with wave.open(path, "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        raw = wav.readframes(wav.getnframes())
+    if width == 2:
+        audio = np.frombuffer(raw, dtype=np.int16).astype(np.float32)
+    elif width == 1:
+        audio = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) * 256
+    elif width == 4:
+        audio = np.frombuffer(raw, dtype=np.int32).astype(np.float32) / 65536
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width * 8} bits")
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    if rate != samplerate and len(audio):
+        n_out = int(len(audio) * samplerate / rate)
+        audio = np.interp(np.arange(n_out) * rate / samplerate, np.arange(len(audio)), audio)
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+class WavFileSource(_PacedSource):
+    """Replays a WAV (or raw 16-bit PCM) file as if it were the microphone.
+
+    After the file ends it keeps emitting silence (so the endpointer can
+    close the last turn) unless `loop` is set, in which case it restarts.
+    """
+
+    def __init__(self, path: str, samplerate: int, frame_size: int, speed: float = 1.0, loop: bool = False):
+        super().__init__(samplerate, frame_size, speed)
+        self.path = path
+        self.loop = loop
+        if path.lower().endswith((".pcm", ".raw")):
+            self._audio = np.fromfile(path, dtype=np.int16)
+        else:
+            self._audio = _read_wav(path, samplerate)
+        self._pos = 0
+        self._silence = np.zeros(frame_size, dtype=np.int16)
+
+    def _next_frame(self) -> Optional[np.ndarray]:
+        if self._pos + self.frame_size > len(self._audio):
+            if not self.loop:
+                return self._silence
+            self._pos = 0
+        frame = self._audio[self._pos:self._pos + self.frame_size]
+        self._pos += self.frame_size
+        return frame
+
+
+class SyntheticSource(_PacedSource):
+    """Generated test signal: voiced 'utterances' separated by low-level noise.
+
+    Utterance and pause lengths (seconds) are configurable; the voice is a
+    harmonic tone with a gliding pitch and syllable-rate envelope, loud
+    enough to trigger webrtcvad.
+    """
+
+    def __init__(self, samplerate: int, frame_size: int, speed: float = 1.0,
+                 utterance_s: float = 2.0, pause_s: float = 3.0, noise_level: float = 0.003, seed: int = 0):
+        super().__init__(samplerate, frame_size, speed)
+        self.utterance_s = utterance_s
+        self.pause_s = pause_s
+        self.noise_level = noise_level
+        self._rng = np.random.default_rng(seed)
+        self._n = 0
+
+    def _next_frame(self) -> Optional[np.ndarray]:
+        t = (self._n + np.arange(self.frame_size)) / self.samplerate
+        self._n += self.frame_size
+        period = self.utterance_s + self.pause_s
+        in_utterance = (t % period) < self.utterance_s
+        f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+        phase = 2 * np.pi * f0 * t
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 7))
+        envelope = np.clip(np.sin(2 * np.pi * 4.0 * t), 0.15, None) * in_utterance
+        signal = 0.25 * voiced * envelope + self.noise_level * self._rng.standard_normal(self.frame_size)
+        return np.clip(signal * 32767, -32768, 32767).astype(np.int16)
+
+
+def create_audio_source(spec: str, samplerate: int, frame_size: int) -> AudioSource:
+    """Build a source from a spec string.
+
+    - "mic" (default): live microphone via sounddevice
+    - "wav:<path>": replay a WAV/PCM file
+    - "synthetic": generated utterances and pauses
+    Replay speed for file/synthetic sources comes from AUDIO_SOURCE_SPEED.
+    """
+    speed = float(os.getenv("AUDIO_SOURCE_SPEED", "1.0"))
+    if spec.startswith("wav:"):
+        return WavFileSource(spec[4:], samplerate, frame_size, speed=speed,
+                             loop=os.getenv("AUDIO_SOURCE_LOOP", "0") == "1")
+    if spec == "synthetic":
+        return SyntheticSource(samplerate, frame_size, speed=speed)
+    if spec != "mic":
+        print(f"[Capture] Unknown AUDIO_SOURCE '{spec}', using microphone")
+    return SoundDeviceSource(samplerate, frame_size)
@@ -0,0 +1,105 @@
+import os
+import threading
+from collections import deque
+
+# --- Configuration ---
+# 0 = patient ... 3 = snappy
+ENDPOINT_AGGRESSIVENESS = int(os.getenv("STT_ENDPOINT_AGGRESSIVENESS", "1"))
+_BASE_HANGOVER_MS = {0: 1000, 1: 800, 2: 600, 3: 450}
+MIN_HANGOVER_MS = 250
+MAX_HANGOVER_MS = 1500
+MIN_PAUSE_MS = 100           # shorter gaps are VAD flicker, not pauses
+PAUSE_HISTORY = 50           # pauses remembered across turns
+SHORT_UTTERANCE_MS = 1500
+LONG_UTTERANCE_MS = 6000
+# Words that usually mean the speaker is not done yet
+_CONTINUATION_WORDS = {"and", "but", "so", "or", "because", "um", "uh", "the", "a", "to", "of", "with"}
+
+
+class AdaptiveEndpointer:
+    """Decides when trailing silence ends a turn.
+
+    The hangover (silence needed to end the turn) starts from a base set by
+    the aggressiveness level and is then adjusted by:
+    - utterance length: short commands end sooner, long turns get more room;
+    - the user's own recent pause lengths, so we do not cut inside a pause
+      that is typical for them (kept across turns);
+    - the trailing text of the partial transcript, if any: final
+      punctuation shortens the wait, a trailing comma or conjunction extends it.
+    """
+
+    def __init__(self, frame_ms: float, aggressiveness: int = ENDPOINT_AGGRESSIVENESS):
+        self.frame_ms = frame_ms
+        self.aggressiveness = max(0, min(3, aggressiveness))
+        self._pauses = deque(maxlen=PAUSE_HISTORY)
+        self.begin_turn()
+
+    def begin_turn(self):
+        """Reset per-turn state; pause statistics are kept."""
+        self.speech_ms = 0.0
+        self.silence_ms = 0.0
+        self.partial_text = ""
+        self.last_hangover_ms = 0.0
+
+    def set_partial_text(self, text: str):
+        self.partial_text = text or ""
+
+    def _pause_p90(self) -> float:
+        if len(self._pauses) < 5:
+            return 0.0
+        ordered = sorted(self._pauses)
+        return ordered[int(0.9 * (len(ordered) - 1))]
+
+    def hangover_ms(self) -> float:
+        hangover = float(_BASE_HANGOVER_MS[self.aggressiveness])
+
+        if self.speech_ms < SHORT_UTTERANCE_MS:
+            hangover *= 0.8
+        elif self.speech_ms > LONG_UTTERANCE_MS:
+            hangover *= 1.2
+
+        hangover = max(hangover, self._pause_p90() * 1.1)
+
+        text = self.partial_text.rstrip()
+        if text:
+            last_word = text.split()[-1].strip(".,!?;:\"'").lower()
+            if text[-1] in ".?!":
+                hangover *= 0.6
+            elif text[-1] in ",;:" or last_word in _CONTINUATION_WORDS:
+                hangover *= 1.3
+
+        return max(MIN_HANGOVER_MS, min(MAX_HANGOVER_MS, hangover))
+
+    def update(self, is_speech: bool) -> bool:
+        """Feed one frame decision after speech has started; True means end of turn."""
+        if is_speech:
+            if self.silence_ms >= MIN_PAUSE_MS:
+                self._pauses.append(self.silence_ms)
+            self.silence_ms = 0.0
+            self.speech_ms += self.frame_ms
+            return False
+
+        self.silence_ms += self.frame_ms
+        self.last_hangover_ms = self.hangover_ms()
+        return self.silence_ms > self.last_hangover_ms
+
+    def metrics(self) -> dict:
+        return {
+            "endpoint_delay_ms": round(self.silence_ms),
+            "hangover_ms": round(self.last_hangover_ms),
+            "speech_ms": round(self.speech_ms),
+            "aggressiveness": self.aggressiveness,
+        }
+
+
+_endpointer = None
+_endpointer_lock = threading.Lock()
+
+
+def get_endpointer(frame_ms: float) -> AdaptiveEndpointer:
+    """Return the session-wide endpointer so pause statistics persist across turns."""
+    global _endpointer
+    with _endpointer_lock:
+        if _endpointer is None:
+            _endpointer = AdaptiveEndpointer(frame_ms)
+        return _endpointer
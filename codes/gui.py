@@ -1,10 +1,11 @@
 import customtkinter as ctk
 import threading
 import asyncio
-import queue
 import tkinter as tk
 from collections import deque
 
+import codes.audio_capture
+import codes.level_meter
 import codes.llm_handler
 import codes.stt_handler
 import codes.tts_handler
@@ -137,12 +138,13 @@ class VoiceChatGUI(ctk.CTk):
     def __init__(self, loop):
         super().__init__()
         self.async_loop = loop
-        self.audio_queue = queue.Queue()
+        self.mic_levels = codes.level_meter.MIC_LEVELS.subscribe()
         self.voice_mode_active = False  # Voice mode popup state
         self.listening = False
         self.stt_worker_active = False
         self.mic_stop_event = threading.Event()
         self.mic_thread = None
+        self.llm_turn = None  # handle of the answer being generated, if any
 
         self.title("Sophia AI Assistant")
         try:
@@ -165,10 +167,15 @@ class VoiceChatGUI(ctk.CTk):
 
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
         
-        self.voice_mode = VoiceMode(self, self.async_loop, self.audio_queue, self.mic_stop_event)
+        self.voice_mode = VoiceMode(self, self.async_loop, self.mic_stop_event)
         
         codes.stt_handler.set_status_callback(self._on_model_loaded)
         codes.tts_handler.set_status_callback(self._on_model_loaded)
+        # Open the microphone once for the whole session so listening starts instantly
+        threading.Thread(target=codes.audio_capture.start_capture, daemon=True).start()
+        # Connect to the LLM providers now so the first question skips DNS/TCP/TLS setup
+        codes.llm_handler.start_connection_warmer(self.async_loop)
+        codes.llm_handler.start_ollama_keeper(self.async_loop)
         self.status_label.configure(
             text="⏳ Loading models...",
             text_color=("#FF9800", "#FFB74D")
@@ -407,6 +414,7 @@ class VoiceChatGUI(ctk.CTk):
         self.chat_display.configure(state="normal")
         self.chat_display.delete("1.0", tk.END)
         self.chat_display.configure(state="disabled")
+        codes.llm_handler.reset_conversation()
         self.show_initial_greeting()
 
     def toggle_theme(self):
@@ -539,7 +547,7 @@ class VoiceChatGUI(ctk.CTk):
         self.stt_worker_active = True
         # S2S mode is controlled by header_tts_button, not automatic
         self.mic_stop_event.clear()
-        self._clear_audio_queue()
+        self.mic_levels.read_new()  # skip levels from before this turn
         self.wave_bubble.reset()
         self.wave_bubble.grid(row=0, column=1, padx=10)
         self.wave_bubble.set_active(True)
@@ -569,9 +577,7 @@ class VoiceChatGUI(ctk.CTk):
 
     def run_mic_logic(self):
         future = asyncio.run_coroutine_threadsafe(
-            codes.stt_handler.listen_and_transcribe(
-                self.audio_queue, stop_event=self.mic_stop_event
-            ),
+            codes.stt_handler.listen_and_transcribe(stop_event=self.mic_stop_event),
             self.async_loop,
         )
 
@@ -603,10 +609,12 @@ class VoiceChatGUI(ctk.CTk):
             if clean_text:
                 self._safe_ui(self.update_chat_display, "Sophia", clean_text, True)
 
-        future = asyncio.run_coroutine_threadsafe(
-            codes.llm_handler.query_llm(prompt, stream_callback=stream_update), 
-            self.async_loop
-        )
+        # A new question supersedes the answer still being generated
+        if self.llm_turn is not None:
+            self.llm_turn.cancel()
+        turn = codes.llm_handler.query_llm(prompt, stream_callback=stream_update)
+        self.llm_turn = turn
+        future = asyncio.run_coroutine_threadsafe(turn.run(), self.async_loop)
         try:
             response_text, provider = future.result()
         except Exception as exc:
@@ -614,7 +622,11 @@ class VoiceChatGUI(ctk.CTk):
             response_text = "I'm still thinking, could you try asking again in a moment?"
             provider = "Unavailable"
             self._safe_ui(self.update_chat_display, "Sophia", response_text, True)
-        
+
+        if turn.cancelled:
+            # The newer turn owns the chat bubble and status bar now
+            return
+        self.llm_turn = None
         self._safe_ui(self.clear_stream_state)
 
         self._safe_ui(self.llm_indicator.set_state, "success")
@@ -653,21 +665,10 @@ class VoiceChatGUI(ctk.CTk):
                     target=self.run_chat_logic, args=(prompt,), daemon=True
                 ).start()
 
-    def _clear_audio_queue(self):
-        while not self.audio_queue.empty():
-            try:
-                self.audio_queue.get_nowait()
-            except queue.Empty:
-                break
-
     def _update_waveform(self):
         if not self.voice_mode_active:
-            latest_amplitude = None
-            while not self.audio_queue.empty():
-                try:
-                    latest_amplitude = self.audio_queue.get_nowait()
-                except queue.Empty:
-                    break
+            levels = self.mic_levels.read_new()
+            latest_amplitude = levels[-1] if levels else None
 
             if latest_amplitude is not None:
                 normalized = min(latest_amplitude * 14, 1.0)
@@ -686,7 +687,7 @@ class VoiceChatGUI(ctk.CTk):
             text=f"✅ {message}",
             text_color=("#4CAF50", "#66BB6A")
         )
-        if codes.stt_handler.STT_MODEL and codes.tts_handler.pipeline:
+        if codes.stt_handler.is_ready() and codes.tts_handler.pipeline:
             self._safe_ui(
                 lambda: self.after(1500, lambda: self.status_label.configure(
                     text="✨ Ready",
@@ -695,5 +696,8 @@ class VoiceChatGUI(ctk.CTk):
             )
 
     def on_closing(self):
+        if self.llm_turn is not None:
+            self.llm_turn.cancel()
+        codes.audio_capture.stop_capture()
         self.async_loop.call_soon_threadsafe(self.async_loop.stop)
         self.destroy()
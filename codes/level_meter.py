@@ -0,0 +1,65 @@
+import time
+from typing import Optional
+
+
+class LevelMeter:
+    """Fixed-size ring of timestamped audio levels (0..1).
+
+    There is a single writer per meter (the capture or playback thread);
+    any number of readers can look at the latest levels or follow new ones
+    through their own cursor. Nothing is ever drained, so readers do not
+    race each other and memory stays bounded when nobody is reading. The
+    writer fills a slot before bumping `count`, so readers never see a
+    half-written entry.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self._levels = [0.0] * capacity
+        self._times = [0.0] * capacity
+        self.count = 0  # total levels published
+
+    def publish(self, level: float, timestamp: Optional[float] = None):
+        slot = self.count % self.capacity
+        self._levels[slot] = level
+        self._times[slot] = time.monotonic() if timestamp is None else timestamp
+        self.count += 1
+
+    def _range(self, start: int, end: int) -> list:
+        # Leave one slot of slack in case the writer laps us mid-read
+        start = max(start, end - self.capacity + 1)
+        return [
+            (self._times[i % self.capacity], self._levels[i % self.capacity])
+            for i in range(start, end)
+        ]
+
+    def latest(self, n: int, max_age: Optional[float] = None) -> list:
+        """The newest `n` levels, oldest first, optionally only those younger than `max_age` s."""
+        entries = self._range(self.count - n, self.count)
+        if max_age is not None:
+            cutoff = time.monotonic() - max_age
+            entries = [e for e in entries if e[0] >= cutoff]
+        return [level for _, level in entries]
+
+    def subscribe(self) -> "LevelReader":
+        return LevelReader(self)
+
+
+class LevelReader:
+    """Independent cursor into a LevelMeter."""
+
+    def __init__(self, meter: LevelMeter):
+        self.meter = meter
+        self._cursor = meter.count
+
+    def read_new(self) -> list:
+        """Levels published since the last call, oldest first (at most one ring's worth)."""
+        end = self.meter.count
+        entries = self.meter._range(self._cursor, end)
+        self._cursor = end
+        return [level for _, level in entries]
+
+
+# Process-wide meters: microphone input while listening, and TTS playback
+MIC_LEVELS = LevelMeter()
+TTS_LEVELS = LevelMeter()
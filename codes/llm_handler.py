@@ -1,6 +1,17 @@
 import os
+import re
+import json
+import hashlib
+import time
 import asyncio
+import itertools
+import threading
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Optional
+from email.utils import parsedate_to_datetime
 import dotenv
+import httpx
 from openai import AsyncOpenAI, APIConnectionError, RateLimitError, APIError
 
 # Load environment variables
@@ -8,11 +19,79 @@ dotenv.load_dotenv()
 
 # Configuration
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-PRIMARY_PROVIDER_URL = "https://openrouter.ai/api/v1"
-PRIMARY_MODEL = "x-ai/grok-4.1-fast:free"
+PRIMARY_PROVIDER_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+PRIMARY_MODEL = os.getenv("OPENROUTER_MODEL", "x-ai/grok-4.1-fast:free")
 
 FALLBACK_PROVIDER_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
 FALLBACK_MODEL = os.getenv("OLLAMA_MODEL", "gemma3:4b")
+# Ollama's native API (model loading, /api/ps) lives next to its OpenAI-compatible /v1
+OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", re.sub(r"/v1/?$", "", FALLBACK_PROVIDER_URL.rstrip("/")))
+# Load the fallback model at startup and keep it resident, so a fallback turn never waits for a load
+OLLAMA_PRELOAD = os.getenv("OLLAMA_PRELOAD", "1") == "1"
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_PROBE_INTERVAL = float(os.getenv("OLLAMA_PROBE_INTERVAL", "60"))
+OLLAMA_LOAD_TIMEOUT = 180.0
+
+# Hedging: if the primary has not produced a first token after this long, the
+# fallback is started in parallel and whichever streams first wins (0 = off)
+HEDGE_MS = int(os.getenv("LLM_HEDGE_MS", "2000"))
+
+# A stream that goes this long without a token after it started counts as broken (0 = off);
+# the answer is then continued on the next provider from the text already emitted
+STALL_MS = int(os.getenv("LLM_STALL_MS", "4000"))
+# Characters of a continuation held back to check whether it restates the prefix
+CONTINUATION_PROBE_CHARS = 40
+
+# Provider health: a circuit opens after this many consecutive failures, or when
+# the error rate over the last HEALTH_WINDOW calls reaches CIRCUIT_ERROR_RATE
+HEALTH_WINDOW = 20
+CIRCUIT_FAILURES = 3
+CIRCUIT_ERROR_RATE = 0.5
+CIRCUIT_MIN_CALLS = 4
+CIRCUIT_OPEN_SECONDS = float(os.getenv("LLM_CIRCUIT_OPEN_SECONDS", "30"))
+# Cooldown after a 429 that carries no Retry-After header
+RATE_LIMIT_COOLDOWN_SECONDS = float(os.getenv("LLM_RATE_LIMIT_COOLDOWN", "60"))
+ROUTING_LOG_SIZE = 50
+
+# HTTP connection pools (one per provider)
+HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "10"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "5"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "120"))
+HTTP2 = os.getenv("LLM_HTTP2", "1") == "1"
+HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+# Idle pools are touched this often so turns never wait for a handshake (0 = warm once at startup)
+WARM_INTERVAL_SECONDS = float(os.getenv("LLM_WARM_INTERVAL", "45"))
+
+# Conversation memory: history is kept under this many (estimated) tokens
+CONTEXT_TOKEN_BUDGET = int(os.getenv("LLM_CONTEXT_TOKENS", "2048"))
+# When the budget is exceeded, history is trimmed down to this fraction of it at once,
+# so the message prefix stays stable (and cacheable) for several turns in between
+CONTEXT_TRIM_TARGET = 0.6
+# Share of the budget the rolling summary of evicted turns may use
+SUMMARY_TOKEN_SHARE = 0.25
+
+# Response cache for repeated questions (off by default)
+RESPONSE_CACHE = os.getenv("LLM_CACHE", "0") == "1"
+CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "256"))
+CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL", "3600"))
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", str(Path(__file__).resolve().parent.parent / "llm_cache.json"))
+# Trigram cosine similarity needed for a near-duplicate hit (0 = exact matches only)
+CACHE_NEAR_THRESHOLD = float(os.getenv("LLM_CACHE_NEAR", "0"))
+# Earlier user messages that must match for a follow-up (e.g. "why?") to hit, so it is never
+# answered from another conversation; self-contained questions ignore them (0 = never)
+CACHE_CONTEXT_TURNS = int(os.getenv("LLM_CACHE_CONTEXT_TURNS", "1"))
+# Prompts this short, or with one of these words, are treated as depending on the previous turn
+CACHE_FOLLOW_UP_MAX_WORDS = 3
+CACHE_FOLLOW_UP_WORDS = frozenset(
+    "it its it's that that's this these those they them their he him his she her there "
+    "another more again else same why".split()
+)
+CACHE_FOLLOW_UP_OPENERS = ("and ", "but ", "so ", "also ", "then ", "what about ", "how about ")
+# Words a near-duplicate may add or drop; any other differing word (or number) rules it out
+CACHE_FILLER_WORDS = frozenset(
+    "please pls plz hey hi hello ok okay so um uh just can could would you me sophia the a an".split()
+)
 
 CHARACTER_PERSONALITY = """
 You are Sophia, a confident 20-year-old girl with a playful, cheeky personality. 
@@ -21,7 +100,66 @@ keep it real, keep it varied. Don't use overly formal language or complex words
 plz don't use any emojis in your responses.
 """
 
-# Initialize Clients (Conditional initialization to prevent startup crashes)
+# Per-provider connection reuse counters, filled from httpcore trace events
+CONNECTION_STATS = {}
+
+
+def _connection_tracer(provider: str):
+    """httpx request hook that classifies each request as a new or reused connection."""
+    stats = CONNECTION_STATS.setdefault(
+        provider, {"requests": 0, "new_connections": 0, "reused": 0, "connect_ms": 0.0, "last": None}
+    )
+
+    async def on_request(request: httpx.Request):
+        state = {"connect_started": None, "connected": False}
+
+        async def trace(event: str, info: dict):
+            if event == "connection.connect_tcp.started":
+                state["connect_started"] = time.perf_counter()
+            elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+                state["connected"] = True
+                # Handshake time ends after TLS for https, after TCP otherwise
+                done = event == "connection.start_tls.complete" or request.url.scheme != "https"
+                if done and state["connect_started"] is not None:
+                    stats["connect_ms"] += (time.perf_counter() - state["connect_started"]) * 1000
+            elif event.endswith("send_request_headers.started"):
+                stats["requests"] += 1
+                stats["last"] = "new" if state["connected"] else "reused"
+                stats["new_connections" if state["connected"] else "reused"] += 1
+
+        request.extensions["trace"] = trace
+
+    return on_request
+
+
+_HTTP_CLIENTS = {}
+
+
+def _make_http_client(provider: str) -> httpx.AsyncClient:
+    # A plain httpx client rather than the SDK's DefaultAsyncHttpxClient: newer SDKs build
+    # that one on a different HTTP library, which does not accept httpx's Limits/Timeout
+    http2 = HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401  (httpx's optional HTTP/2 support)
+        except ImportError:
+            http2 = False
+    _HTTP_CLIENTS[provider] = httpx.AsyncClient(
+        http2=http2,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        event_hooks={"request": [_connection_tracer(provider)]},
+    )
+    return _HTTP_CLIENTS[provider]
+
+
+# Initialize Clients (Conditional initialization to prevent startup crashes).
+# The SDK's own retries are off: failover, hedging and health tracking here must see every error at once
 primary_client = None
 if OPENROUTER_API_KEY:
     primary_client = AsyncOpenAI(
@@ -30,123 +168,994 @@ if OPENROUTER_API_KEY:
         default_headers={
             "HTTP-Referer": "http://localhost:3000", 
             "X-Title": "Sophia AI"
-        }
+        },
+        http_client=_make_http_client("OpenRouter"),
+        max_retries=0,
     )
 
 # Ollama usually accepts any string as a key, but 'ollama' is standard
 fallback_client = AsyncOpenAI(
     base_url=FALLBACK_PROVIDER_URL, 
-    api_key=os.getenv("OLLAMA_API_KEY", "ollama")
+    api_key=os.getenv("OLLAMA_API_KEY", "ollama"),
+    http_client=_make_http_client("Ollama"),
+    max_retries=0,
 )
 
-async def query_llm(prompt: str, stream_callback=None) -> tuple[str, str]:
-    
-    # --- Attempt 1: OpenRouter ---
-    if primary_client:
+
+async def _warm_client(provider: str, client: AsyncOpenAI):
+    """Open (or refresh) a pooled connection with a cheap request; the status code does not matter."""
+    start = time.perf_counter()
+    try:
+        await _HTTP_CLIENTS[provider].head(str(client.base_url))
+    except Exception as e:
+        print(f"[LLM] Could not pre-connect to {provider}: {type(e).__name__}")
+        return
+    return (time.perf_counter() - start) * 1000
+
+
+async def _warm_connections():
+    while True:
+        clients = [("Ollama", fallback_client)]
+        if primary_client:
+            clients.insert(0, ("OpenRouter", primary_client))
+        results = await asyncio.gather(
+            *(_warm_client(name, client) for name, client in clients), return_exceptions=True
+        )
+        for (name, _), elapsed in zip(clients, results):
+            if isinstance(elapsed, float) and CONNECTION_STATS.get(name, {}).get("last") == "new":
+                print(f"[LLM] Connected to {name} in {elapsed:.0f} ms")
+        if WARM_INTERVAL_SECONDS <= 0:
+            return
+        await asyncio.sleep(WARM_INTERVAL_SECONDS)
+
+
+_warm_task = None
+
+
+def start_connection_warmer(loop: asyncio.AbstractEventLoop):
+    """Pre-connect both providers on `loop` at app start and keep the pools warm."""
+    def start():
+        global _warm_task
+        if _warm_task is None:
+            _warm_task = loop.create_task(_warm_connections())
+
+    loop.call_soon_threadsafe(start)
+
+
+def connection_stats() -> dict:
+    return {name: dict(stats) for name, stats in CONNECTION_STATS.items()}
+
+
+# Readiness of the fallback model, kept up to date by the background probe
+OLLAMA_STATUS = {"ready": False, "checked": None, "last_load_ms": None, "loads": 0}
+_ollama_loading = None  # task of a preload in progress
+_ollama_task = None
+
+
+def _same_model(name: str, wanted: str) -> bool:
+    # Ollama reports "gemma3:4b" but also accepts "gemma3" for "gemma3:latest"
+    def tagged(model):
+        return model if ":" in model else model + ":latest"
+    return tagged(name) == tagged(wanted)
+
+
+async def _ollama_model_loaded() -> Optional[bool]:
+    """Ask /api/ps whether the fallback model is in memory; None if Ollama is unreachable."""
+    try:
+        response = await _HTTP_CLIENTS["Ollama"].get(f"{OLLAMA_API_URL}/api/ps")
+        response.raise_for_status()
+        models = response.json().get("models", [])
+    except Exception:
+        return None
+    return any(_same_model(m.get("name") or m.get("model", ""), FALLBACK_MODEL) for m in models)
+
+
+async def _ollama_preload():
+    """Load the fallback model through the native API (an empty generate) with our keep_alive."""
+    start = time.perf_counter()
+    try:
+        response = await _HTTP_CLIENTS["Ollama"].post(
+            f"{OLLAMA_API_URL}/api/generate",
+            json={"model": FALLBACK_MODEL, "keep_alive": OLLAMA_KEEP_ALIVE},
+            timeout=OLLAMA_LOAD_TIMEOUT,
+        )
+        response.raise_for_status()
+    except Exception as e:
+        print(f"[LLM] Could not preload {FALLBACK_MODEL} on Ollama: {type(e).__name__}: {e}")
+        OLLAMA_STATUS["ready"] = False
+        return
+    elapsed = (time.perf_counter() - start) * 1000
+    OLLAMA_STATUS.update(ready=True, last_load_ms=round(elapsed), loads=OLLAMA_STATUS["loads"] + 1)
+    print(f"[LLM] Ollama model {FALLBACK_MODEL} ready (load took {elapsed:.0f} ms, keep_alive {OLLAMA_KEEP_ALIVE})")
+
+
+def _kick_ollama_preload():
+    """Start a preload unless one is already running (call on the event loop)."""
+    global _ollama_loading
+    if _ollama_loading is None or _ollama_loading.done():
+        _ollama_loading = asyncio.ensure_future(_ollama_preload())
+    return _ollama_loading
+
+
+async def _ollama_keeper():
+    """Preload the fallback model, then re-check /api/ps and reload it whenever Ollama dropped it.
+
+    Ollama being down (or any other error) is logged and retried on the
+    next probe; the keeper itself only stops when its task is cancelled.
+    """
+    loaded = None
+    while True:
         try:
-            print(f"[LLM] 🔵 Trying OpenRouter ({PRIMARY_MODEL})...")
-            
-            if stream_callback:
-                # Streaming mode
-                full_response = ""
-                stream = await primary_client.chat.completions.create(
-                    model=PRIMARY_MODEL,
-                    messages=[
-                        {"role": "system", "content": CHARACTER_PERSONALITY},
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=0.7,
-                    stream=True,
-                )
-                async for chunk in stream:
-                    if chunk.choices[0].delta.content:
-                        content = chunk.choices[0].delta.content
-                        full_response += content
-                        stream_callback(content)
-                
-                if full_response:
-                    print("[LLM] OpenRouter successful (streamed).")
-                    return full_response.strip(), "OpenRouter"
-            else:
-                # Non-streaming mode
-                response = await primary_client.chat.completions.create(
-                    model=PRIMARY_MODEL,
-                    messages=[
-                        {"role": "system", "content": CHARACTER_PERSONALITY},
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=0.7,
-                )
-                content = response.choices[0].message.content
-                if content:
-                    print("[LLM] OpenRouter successful.")
-                    return content.strip(), "OpenRouter"
-                
-        except APIConnectionError as e:
-            print(f"[LLM] OpenRouter Connection Error: {e}")
-        except RateLimitError:
-            print(f"[LLM] OpenRouter Rate Limit Reached (Free Tier).")
-        except APIError as e:
-            print(f"[LLM] OpenRouter API Error: {e}")
+            if not loaded:
+                OLLAMA_STATUS["ready"] = False
+                if loaded is False:
+                    print(f"[LLM] Ollama unloaded {FALLBACK_MODEL}, loading it again")
+                await _kick_ollama_preload()
         except Exception as e:
-            print(f"[LLM] Unexpected OpenRouter error: {e}")
+            print(f"[LLM] Ollama preload failed: {type(e).__name__}: {e}")
+        if OLLAMA_PROBE_INTERVAL <= 0:
+            return
+        await asyncio.sleep(OLLAMA_PROBE_INTERVAL)
+        loaded = await _ollama_model_loaded()
+        OLLAMA_STATUS["checked"] = time.time()
+        if loaded:
+            OLLAMA_STATUS["ready"] = True
+
+
+def start_ollama_keeper(loop: asyncio.AbstractEventLoop):
+    """Preload the Ollama fallback model on `loop` at app start and keep it resident."""
+    if not OLLAMA_PRELOAD:
+        return
+
+    def start():
+        global _ollama_task
+        if _ollama_task is None:
+            _ollama_task = loop.create_task(_ollama_keeper())
+
+    loop.call_soon_threadsafe(start)
+
+# Prompt size and cache indicators of the most recent query_llm call
+LAST_TURN_STATS = {}
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token, plus message overhead)."""
+    return len(text) // 4 + 4
+
+
+def _first_sentence(text: str, max_chars: int = 160) -> str:
+    text = " ".join(text.split())
+    for end in (". ", "! ", "? "):
+        idx = text.find(end)
+        if 0 < idx < max_chars:
+            return text[:idx + 1]
+    return text if len(text) <= max_chars else text[:max_chars].rsplit(" ", 1)[0] + "..."
+
+
+class ConversationStore:
+    """Rolling chat history for one session, kept under a token budget.
+
+    Messages always start with the unchanged system prompt, so providers
+    that cache prompt prefixes (and Ollama's KV cache) can reuse it. Once
+    the history outgrows the budget, the oldest turns are folded into a
+    short extractive summary (no extra LLM call) in one go, trimming well
+    below the budget; between trims, each request's messages extend the
+    previous request's, so the whole earlier prompt is a cache hit.
+    """
+
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET, system_prompt: str = CHARACTER_PERSONALITY):
+        self.token_budget = token_budget
+        self.system_prompt = system_prompt
+        self.reset()
+
+    def reset(self):
+        self.turns = []          # [(user text, assistant text)]
+        self.summary_lines = []  # one line per evicted turn, oldest first
+        self.evicted_turns = 0
+
+    def _summary_message(self) -> list:
+        if not self.summary_lines:
+            return []
+        content = "Summary of the earlier conversation:\n" + "\n".join(self.summary_lines)
+        return [{"role": "system", "content": content}]
+
+    def _history_tokens(self) -> int:
+        tokens = sum(_estimate_tokens(line) for line in self.summary_lines)
+        return tokens + sum(_estimate_tokens(u) + _estimate_tokens(a) for u, a in self.turns)
+
+    def _trim(self):
+        if self._history_tokens() <= self.token_budget:
+            return
+        target = self.token_budget * CONTEXT_TRIM_TARGET
+        # Always keep the latest turn verbatim
+        while len(self.turns) > 1 and self._history_tokens() > target:
+            user, assistant = self.turns.pop(0)
+            self.summary_lines.append(f"- User: {_first_sentence(user)} / Sophia: {_first_sentence(assistant)}")
+            self.evicted_turns += 1
+        summary_budget = self.token_budget * SUMMARY_TOKEN_SHARE
+        while self.summary_lines and sum(_estimate_tokens(l) for l in self.summary_lines) > summary_budget:
+            self.summary_lines.pop(0)
+
+    def add_turn(self, user: str, assistant: str):
+        self.turns.append((user, assistant))
+        self._trim()
+
+    def build_messages(self, prompt: str) -> list:
+        messages = [{"role": "system", "content": self.system_prompt}]
+        messages += self._summary_message()
+        for user, assistant in self.turns:
+            messages.append({"role": "user", "content": user})
+            messages.append({"role": "assistant", "content": assistant})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+
+_conversations = {}
+# Serialised messages of the previous request per session, to measure prefix reuse
+_previous_requests = {}
+
+
+def get_conversation(session_id: str = "default") -> ConversationStore:
+    if session_id not in _conversations:
+        _conversations[session_id] = ConversationStore()
+    return _conversations[session_id]
+
+
+def reset_conversation(session_id: str = "default"):
+    """Forget the history of a session (e.g. when the chat is cleared)."""
+    get_conversation(session_id).reset()
+    _previous_requests.pop(session_id, None)
+    print(f"[LLM] Conversation '{session_id}' reset")
+
+
+def _normalize_prompt(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+def _trigram_vector(text: str) -> dict:
+    """Bag of character trigrams, L2-normalised: a tiny local embedding for near-duplicate lookup."""
+    padded = f"  {text} "
+    counts = {}
+    for i in range(len(padded) - 2):
+        gram = padded[i:i + 3]
+        counts[gram] = counts.get(gram, 0) + 1
+    norm = sum(c * c for c in counts.values()) ** 0.5 or 1.0
+    return {gram: c / norm for gram, c in counts.items()}
+
+
+def _cosine(a: dict, b: dict) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(gram, 0.0) for gram, v in a.items())
+
+
+def _same_words(a: str, b: str) -> bool:
+    """True if two normalised prompts differ only in filler words.
+
+    Trigram similarity alone rates "turn on the light" / "turn off the
+    light" or "10 minutes" / "15 minutes" as near-identical.
+    """
+    return set(a.split()) ^ set(b.split()) <= CACHE_FILLER_WORDS
+
+
+class ResponseCache:
+    """LRU cache of answers keyed by normalised prompt and a hash of the context.
+
+    The context hash covers the system prompt and, for prompts that look
+    like follow-ups, the last CACHE_CONTEXT_TURNS user messages, so "why?"
+    is only answered from the same line of conversation while a repeated
+    self-contained question still hits. Assistant text is left out: it is
+    sampled, so it would almost never repeat. With a near threshold set, misses fall back to a
+    near-duplicate search (trigram cosine similarity) among entries with the
+    same context and the same words apart from fillers. Entries expire after
+    CACHE_TTL_SECONDS and the cache is persisted as JSON.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = CACHE_SIZE,
+                 ttl: float = CACHE_TTL_SECONDS, near_threshold: float = CACHE_NEAR_THRESHOLD):
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.near_threshold = near_threshold
+        self._entries = OrderedDict()  # key -> entry dict, least recently used first
+        self._vectors = {}
+        self.hits = self.near_hits = self.misses = 0
+        self._load()
+
+    @staticmethod
+    def is_follow_up(prompt: str) -> bool:
+        normalized = _normalize_prompt(prompt)
+        words = normalized.split()
+        return (
+            len(words) <= CACHE_FOLLOW_UP_MAX_WORDS
+            or normalized.startswith(CACHE_FOLLOW_UP_OPENERS)
+            or not CACHE_FOLLOW_UP_WORDS.isdisjoint(words)
+        )
+
+    @staticmethod
+    def context_hash(conversation: ConversationStore, prompt: str) -> str:
+        context = []
+        if CACHE_CONTEXT_TURNS > 0 and ResponseCache.is_follow_up(prompt):
+            context = [_normalize_prompt(user) for user, _ in conversation.turns[-CACHE_CONTEXT_TURNS:]]
+        payload = json.dumps([conversation.system_prompt, context], ensure_ascii=False)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _expired(self, entry: dict) -> bool:
+        return self.ttl > 0 and time.time() - entry["created"] > self.ttl
+
+    def _remove(self, key: str):
+        self._entries.pop(key, None)
+        self._vectors.pop(key, None)
+
+    def get(self, prompt: str, context: str):
+        """Return (entry, "exact" | "near") or (None, None)."""
+        normalized = _normalize_prompt(prompt)
+        key = f"{context}:{normalized}"
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry):
+            self._remove(key)
+            entry = None
+        match = "exact" if entry is not None else None
+
+        if entry is None and self.near_threshold > 0 and normalized:
+            vector = _trigram_vector(normalized)
+            best, best_score = None, self.near_threshold
+            for other_key, other in list(self._entries.items()):
+                if other["context"] != context:
+                    continue
+                if self._expired(other):
+                    self._remove(other_key)
+                    continue
+                if not _same_words(normalized, other["prompt"]):
+                    continue
+                score = _cosine(vector, self._vectors[other_key])
+                if score >= best_score:
+                    best, best_score = other_key, score
+            if best is not None:
+                key, entry, match = best, self._entries[best], "near"
+
+        if entry is None:
+            self.misses += 1
+            return None, None
+        self._entries.move_to_end(key)
+        if match == "exact":
+            self.hits += 1
+        else:
+            self.near_hits += 1
+        return entry, match
+
+    def put(self, prompt: str, context: str, response: str, provider: str):
+        normalized = _normalize_prompt(prompt)
+        if not normalized:
+            return
+        key = f"{context}:{normalized}"
+        self._entries[key] = {
+            "prompt": normalized,
+            "context": context,
+            "response": response,
+            "provider": provider,
+            "created": time.time(),
+        }
+        self._entries.move_to_end(key)
+        self._vectors[key] = _trigram_vector(normalized)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+        self._save()
+
+    def clear(self):
+        self._entries.clear()
+        self._vectors.clear()
+        self._save()
+
+    def _load(self):
+        if not self.path or not self.path.exists():
+            return
+        try:
+            entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"[LLM] Ignoring unreadable response cache {self.path}: {e}")
+            return
+        for entry in entries[-self.max_entries:]:
+            if self._expired(entry):
+                continue
+            key = f"{entry['context']}:{entry['prompt']}"
+            self._entries[key] = entry
+            self._vectors[key] = _trigram_vector(entry["prompt"])
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp = self.path.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps(list(self._entries.values()), ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[LLM] Could not save response cache: {e}")
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "near_hits": self.near_hits, "misses": self.misses}
+
+
+response_cache = ResponseCache() if RESPONSE_CACHE else None
+
+
+def _replay(text: str, stream_callback):
+    """Feed a cached answer through the stream callback in word-sized pieces, like a live stream."""
+    for piece in re.findall(r"\s*\S+", text):
+        stream_callback(piece)
+
+
+def _reused_prefix_tokens(session_id: str, messages: list) -> int:
+    """Estimated tokens at the start of this request identical to the previous one."""
+    current = [json.dumps(m, ensure_ascii=False) for m in messages]
+    previous = _previous_requests.get(session_id, [])
+    _previous_requests[session_id] = current
+    tokens = 0
+    for old, new, message in zip(previous, current, messages):
+        if old != new:
+            break
+        tokens += _estimate_tokens(message["content"])
+    return tokens
+
+
+def _record_usage(usage):
+    if usage is None:
+        return
+    LAST_TURN_STATS["prompt_tokens"] = usage.prompt_tokens
+    LAST_TURN_STATS["completion_tokens"] = usage.completion_tokens
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details else None
+    if cached is not None:
+        LAST_TURN_STATS["cached_tokens"] = cached
+
+
+async def _complete(client: AsyncOpenAI, model: str, messages: list, stream_callback=None, extra_body=None) -> str:
+    """One chat completion, streamed to `stream_callback` when given; returns the full text."""
+    if not stream_callback:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.7,
+            extra_body=extra_body,
+        )
+        _record_usage(response.usage)
+        return response.choices[0].message.content or ""
+
+    full_response = ""
+    stall_timeout = STALL_MS / 1000 if STALL_MS > 0 else None
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=0.7,
+        stream=True,
+        stream_options={"include_usage": True},
+        extra_body=extra_body,
+    )
+    chunks = stream.__aiter__()
+    try:
+        while True:
+            try:
+                # The wait for the first token is bounded by the HTTP read timeout instead
+                chunk = await asyncio.wait_for(chunks.__anext__(), stall_timeout if full_response else None)
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                raise StreamStalled(f"no token for {STALL_MS} ms after {len(full_response)} characters")
+            # The final usage chunk has no choices
+            if chunk.usage is not None:
+                _record_usage(chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                content = chunk.choices[0].delta.content
+                full_response += content
+                stream_callback(content)
+    finally:
+        # Also runs on cancellation, so the server stops generating for a lost race
+        await stream.response.aclose()
+    return full_response
+
+
+class StreamStalled(Exception):
+    """A streamed answer stopped producing tokens."""
+
+
+def _log_provider_error(provider: str, e: Exception):
+    if isinstance(e, StreamStalled):
+        print(f"[LLM] {provider} stream stalled: {e}")
+    elif isinstance(e, APIConnectionError):
+        print(f"[LLM] {provider} Connection Error: {e}")
+        if provider == "Ollama":
+            print(f"       Ensure Ollama is running at {FALLBACK_PROVIDER_URL}")
+    elif isinstance(e, RateLimitError):
+        print(f"[LLM] {provider} Rate Limit Reached.")
+    elif isinstance(e, APIError):
+        print(f"[LLM] {provider} API Error: {e}")
     else:
-        print("[LLM] OpenRouter skipped (No API Key found).")
+        print(f"[LLM] Unexpected {provider} error: {e}")
 
-    # --- Attempt 2: Ollama (Fallback) ---
+
+def _retry_after_seconds(e: Exception):
+    """Seconds to wait according to a 429 response's Retry-After header, if any."""
+    response = getattr(e, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
     try:
-        print(f"[LLM] Trying Ollama Fallback ({FALLBACK_MODEL})...")
-        
-        if stream_callback:
-            # Streaming mode
-            full_response = ""
-            stream = await fallback_client.chat.completions.create(
-                model=FALLBACK_MODEL,
-                messages=[
-                    {"role": "system", "content": CHARACTER_PERSONALITY},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.7,
-                stream=True,
-            )
-            async for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    content = chunk.choices[0].delta.content
-                    full_response += content
-                    stream_callback(content)
-            
-            if full_response:
-                print("[LLM] Ollama successful (streamed).")
-                return full_response.strip(), "Ollama"
-        else:
-            # Non-streaming mode
-            response = await fallback_client.chat.completions.create(
-                model=FALLBACK_MODEL,
-                messages=[
-                    {"role": "system", "content": CHARACTER_PERSONALITY},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.7,
-            )
-            content = response.choices[0].message.content
-            if content:
-                print("[LLM] Ollama successful.")
-                return content.strip(), "Ollama"
-
-    except APIConnectionError as e:
-        print(f"[LLM] Ollama Connection Error: {e}")
-        print(f"       Ensure Ollama is running at {FALLBACK_PROVIDER_URL}")
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ProviderHealth:
+    """Rolling health of one provider, with a circuit breaker.
+
+    closed: requests flow normally. open: the provider is skipped without
+    touching the network until CIRCUIT_OPEN_SECONDS have passed. half-open:
+    one trial request is let through; success closes the circuit, failure
+    opens it again. A 429 additionally puts the provider on cooldown for
+    as long as its Retry-After header asks.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.outcomes = deque(maxlen=HEALTH_WINDOW)  # True = success
+        self.consecutive_failures = 0
+        self.state = "closed"
+        self.open_until = 0.0
+        self.cooldown_until = 0.0
+        self.trial_in_flight = False
+        self.last_error = None
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def check(self):
+        """Return (usable, reason). Nothing is reserved; see `begin_attempt`."""
+        now = time.monotonic()
+        if now < self.cooldown_until:
+            return False, f"rate limited for another {self.cooldown_until - now:.0f} s"
+        if self.state == "open":
+            if now < self.open_until:
+                return False, f"circuit open for another {self.open_until - now:.0f} s ({self.last_error})"
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self.trial_in_flight:
+                return False, "circuit half-open, trial request in flight"
+        return True, self.state
+
+    def begin_attempt(self):
+        """Called when a request is actually sent: a half-open provider's one trial is now taken."""
+        if self.state == "half_open":
+            self.trial_in_flight = True
+
+    def release(self):
+        """Give back a trial request that ended without an outcome (e.g. lost a hedge race)."""
+        self.trial_in_flight = False
+
+    def record_success(self):
+        if self.state != "closed":
+            # Start the error rate afresh, or the old failures would trip it again at once
+            self.outcomes.clear()
+            print(f"[LLM] {self.name} circuit closed")
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        self.trial_in_flight = False
+        self.state = "closed"
+
+    def record_failure(self, e: Exception):
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        self.trial_in_flight = False
+        self.last_error = type(e).__name__
+        if isinstance(e, RateLimitError):
+            cooldown = _retry_after_seconds(e)
+            cooldown = RATE_LIMIT_COOLDOWN_SECONDS if cooldown is None else cooldown
+            self.cooldown_until = time.monotonic() + cooldown
+            print(f"[LLM] {self.name} cooling down for {cooldown:.0f} s")
+        tripped = self.consecutive_failures >= CIRCUIT_FAILURES or (
+            len(self.outcomes) >= CIRCUIT_MIN_CALLS and self.error_rate >= CIRCUIT_ERROR_RATE
+        )
+        if self.state == "half_open" or (self.state == "closed" and tripped):
+            self.state = "open"
+            self.open_until = time.monotonic() + CIRCUIT_OPEN_SECONDS
+            print(f"[LLM] {self.name} circuit open for {CIRCUIT_OPEN_SECONDS:.0f} s")
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        return {
+            "state": self.state,
+            "error_rate": round(self.error_rate, 2),
+            "consecutive_failures": self.consecutive_failures,
+            "cooldown_seconds": round(max(0.0, self.cooldown_until - now), 1),
+            "open_seconds": round(max(0.0, self.open_until - now), 1) if self.state == "open" else 0.0,
+            "last_error": self.last_error,
+        }
+
+
+PROVIDER_HEALTH = {"OpenRouter": ProviderHealth("OpenRouter"), "Ollama": ProviderHealth("Ollama")}
+# Why each recent turn went where it went, newest last
+ROUTING_LOG = deque(maxlen=ROUTING_LOG_SIZE)
+
+
+def provider_health() -> dict:
+    return {name: health.snapshot() for name, health in PROVIDER_HEALTH.items()}
+
+
+def get_routing_log() -> list:
+    return list(ROUTING_LOG)
+
+
+class _ContinuationFilter:
+    """Drops a continuation's restatement of the prefix it was asked to continue.
+
+    Not every model honours an assistant prefill; some start the answer
+    over. The first few characters are held back: if they repeat the
+    prefix, the continuation is skipped until it has passed the prefix.
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix.strip()
+        self.probe_chars = min(len(self.prefix), CONTINUATION_PROBE_CHARS)
+        self.buffer = ""
+        self.mode = "probe"  # then "pass", or "skip" while the prefix is being restated
+
+    def feed(self, text: str) -> str:
+        if self.mode == "pass":
+            return text
+        self.buffer += text
+        head = self.buffer.lstrip()
+        if self.mode == "probe":
+            if len(head) < self.probe_chars:
+                return ""
+            if head[:self.probe_chars] != self.prefix[:self.probe_chars]:
+                self.mode = "pass"
+                out, self.buffer = self.buffer, ""
+                return out
+            print("[LLM] Continuation restates the answer, skipping the repeated part")
+            self.mode = "skip"
+        if len(head) <= len(self.prefix):
+            return ""
+        self.mode = "pass"
+        self.buffer = ""
+        return head[len(self.prefix):]
+
+    def flush(self) -> str:
+        out = self.buffer if self.mode == "probe" else ""
+        self.buffer = ""
+        return out
+
+
+class _HedgeRace:
+    """Decides which of the concurrently running providers reaches the caller.
+
+    The first provider to produce a token (or, without streaming, a whole
+    response) wins; tokens from any other provider are dropped. A race
+    that continues a broken answer starts from that answer's text.
+    """
+
+    def __init__(self, stream_callback=None, prefix: str = ""):
+        self.stream_callback = stream_callback
+        self.winner = None
+        self.decided = asyncio.Event()
+        self.started = time.perf_counter()
+        self.text = prefix  # everything passed to stream_callback this turn
+        self._filter = _ContinuationFilter(prefix) if prefix else None
+        self._joining = bool(prefix)  # next emitted text is glued onto the prefix
+
+    def claim(self, provider: str) -> bool:
+        if self.winner is None:
+            self.winner = provider
+            self.decided.set()
+            LAST_TURN_STATS.setdefault("first_token_ms", round((time.perf_counter() - self.started) * 1000))
+        return self.winner == provider
+
+    def _emit(self, text: str):
+        if self._joining and self.text[-1:].isspace():
+            text = text.lstrip()
+        if text:
+            self._joining = False
+            self.text += text
+            self.stream_callback(text)
+
+    def callback_for(self, provider: str):
+        if not self.stream_callback:
+            return None
+
+        def on_token(text):
+            if self.claim(provider):
+                self._emit(self._filter.feed(text) if self._filter else text)
+        return on_token
+
+    def finish(self) -> str:
+        """Flush held-back text once the winner's stream ended; returns the full answer."""
+        if self._filter:
+            self._emit(self._filter.flush())
+        return self.text
+
+
+async def _attempt(provider: str, client: AsyncOpenAI, model: str, messages: list, race: _HedgeRace):
+    """Run one provider for the race; returns its text if it won, None otherwise."""
+    health = PROVIDER_HEALTH[provider]
+    try:
+        # Ollama resets its unload timer to keep_alive on every request
+        extra_body = {"keep_alive": OLLAMA_KEEP_ALIVE} if provider == "Ollama" else None
+        content = await _complete(client, model, messages, race.callback_for(provider), extra_body)
+    except asyncio.CancelledError:
+        health.release()
+        raise
     except Exception as e:
-        print(f"[LLM] Unexpected Ollama error: {e}")
+        _log_provider_error(provider, e)
+        health.record_failure(e)
+        return None
+    if not content:
+        health.record_failure(RuntimeError("empty response"))
+        return None
+    health.record_success()
+    if race.claim(provider):
+        return content
+    return None
+
+
+async def _query_providers(providers: list, messages: list, stream_callback=None) -> tuple:
+    """Try `providers` [(name, client, model)] in order, hedging on a slow first token.
+
+    Returns (text, provider name), or (None, None) if every provider failed.
+    """
+    remaining = list(providers)
+    pending = {}  # task -> (name, client, model)
+    race = _HedgeRace(stream_callback)
+    attempt_messages = messages
+
+    def launch():
+        provider = remaining.pop(0)
+        name, client, model = provider
+        print(f"[LLM] Trying {name} ({model})...")
+        PROVIDER_HEALTH[name].begin_attempt()
+        LAST_TURN_STATS.setdefault("tried", []).append(name)
+        pending[asyncio.create_task(_attempt(name, client, model, attempt_messages, race))] = provider
+
+    launch()
+    try:
+        while pending:
+            waits = set(pending)
+            waiter = None
+            hedge = None
+            if race.winner is None:
+                waiter = asyncio.ensure_future(race.decided.wait())
+                waits.add(waiter)
+                if HEDGE_MS > 0 and remaining:
+                    hedge = HEDGE_MS / 1000
+            done, _ = await asyncio.wait(waits, timeout=hedge, return_when=asyncio.FIRST_COMPLETED)
+            if waiter is not None:
+                waiter.cancel()
+                done.discard(waiter)
+
+            if not done and race.winner is None:
+                waiting_on = ", ".join(p[0] for p in pending.values())
+                print(f"[LLM] No first token from {waiting_on} after {HEDGE_MS} ms, hedging")
+                LAST_TURN_STATS["hedged"] = True
+                launch()
+                continue
+
+            if race.winner is not None:
+                # Losers stop now, but stay in reserve in case the winner fails later on.
+                # One that already finished in this wakeup (i.e. failed) is not a reserve.
+                for task, provider in list(pending.items()):
+                    if provider[0] != race.winner and task not in done:
+                        task.cancel()
+                        del pending[task]
+                        remaining.insert(0, provider)
+
+            for task in done:
+                if task not in pending:
+                    continue
+                name = pending.pop(task)[0]
+                content = task.result()
+                if content:
+                    return (race.finish() if stream_callback else content), name
+                if race.winner == name:
+                    # The winner broke off mid-answer: the next provider continues from
+                    # what was already spoken instead of starting over
+                    spoken = race.finish()
+                    race = _HedgeRace(stream_callback, prefix=spoken)
+                    if spoken.strip():
+                        print(f"[LLM] {name} broke off after {len(spoken)} characters, continuing elsewhere")
+                        LAST_TURN_STATS["failover"] = {"from": name, "emitted_chars": len(spoken)}
+                        attempt_messages = messages + [{"role": "assistant", "content": spoken}]
+
+            if not pending and remaining:
+                launch()
+    finally:
+        for task in pending:
+            task.cancel()
+    return None, None
+
+
+def _finish_turn(conversation: ConversationStore, prompt: str, response: str, provider: str) -> tuple[str, str]:
+    response = response.strip()
+    conversation.add_turn(prompt, response)
+    LAST_TURN_STATS["provider"] = provider
+    LAST_TURN_STATS["connection"] = CONNECTION_STATS.get(provider, {}).get("last")
+    cached = LAST_TURN_STATS.get("cached_tokens")
+    print(
+        f"[LLM] Prompt ~{LAST_TURN_STATS['prompt_tokens_est']} tokens "
+        f"({LAST_TURN_STATS['history_turns']} turns in context, "
+        f"~{LAST_TURN_STATS['reused_prefix_tokens']} unchanged since last turn"
+        + (f", {cached} cached by provider" if cached is not None else "")
+        + (f", {LAST_TURN_STATS['connection']} connection" if LAST_TURN_STATS["connection"] else "")
+        + ")"
+    )
+    return response, provider
+
+
+async def _run_query(prompt: str, stream_callback=None, session_id: str = "default") -> tuple[str, str]:
+    conversation = get_conversation(session_id)
+    messages = conversation.build_messages(prompt)
+    LAST_TURN_STATS.clear()
+    LAST_TURN_STATS.update({
+        "prompt_tokens_est": sum(_estimate_tokens(m["content"]) for m in messages),
+        "history_turns": len(conversation.turns),
+        "evicted_turns": conversation.evicted_turns,
+        "reused_prefix_tokens": _reused_prefix_tokens(session_id, messages),
+    })
+
+    context = None
+    if response_cache is not None:
+        context = ResponseCache.context_hash(conversation, prompt)
+        entry, match = response_cache.get(prompt, context)
+        if entry is not None:
+            print(f"[LLM] Cache hit ({match}) for: {entry['prompt']!r}")
+            LAST_TURN_STATS["cache"] = match
+            if stream_callback:
+                _replay(entry["response"], stream_callback)
+            return _finish_turn(conversation, prompt, entry["response"], "Cache")
+
+    if _ollama_task is not None and not OLLAMA_STATUS["ready"]:
+        # Get the fallback model loading now, while the primary is being tried
+        _kick_ollama_preload()
+
+    candidates = []
+    skipped = {}
+    if primary_client:
+        candidates.append(("OpenRouter", primary_client, PRIMARY_MODEL))
+    else:
+        print("[LLM] OpenRouter skipped (No API Key found).")
+        skipped["OpenRouter"] = "no API key"
+    candidates.append(("Ollama", fallback_client, FALLBACK_MODEL))
+
+    providers = []
+    for candidate in candidates:
+        usable, reason = PROVIDER_HEALTH[candidate[0]].check()
+        if usable:
+            providers.append(candidate)
+        else:
+            print(f"[LLM] {candidate[0]} skipped ({reason}).")
+            skipped[candidate[0]] = reason
+    if not providers:
+        # Everything is unhealthy: still try the last resort rather than answer nothing
+        providers.append(candidates[-1])
+
+    content, provider = await _query_providers(providers, messages, stream_callback)
+    ROUTING_LOG.append({
+        "time": time.time(),
+        "provider": provider,
+        "tried": LAST_TURN_STATS.get("tried", []),
+        "skipped": skipped,
+        "hedged": LAST_TURN_STATS.get("hedged", False),
+        "health": provider_health(),
+    })
+    LAST_TURN_STATS["skipped"] = skipped
+    if content:
+        print(f"[LLM] {provider} successful" + (" (streamed)." if stream_callback else "."))
+        if response_cache is not None:
+            response_cache.put(prompt, context, content.strip(), provider)
+        return _finish_turn(conversation, prompt, content, provider)
 
     # --- All Failed ---
     print("[LLM] All LLM providers failed.")
     return "Oops! My thinking cap is offline right now.", "None"
 
+
+CANCELLED_RESULT = ("", "Cancelled")
+
+
+class LLMTurn:
+    """Handle for one query_llm call.
+
+    Await it (or schedule `run()` on the event loop) to get
+    (text, provider). `cancel()` may be called from any thread: callbacks
+    stop at once, the running request task is cancelled (which closes the
+    HTTP stream, so the provider stops generating), listeners added with
+    `add_cancel_callback` run (e.g. to flush TTS tagged with `id`), and
+    the turn resolves to CANCELLED_RESULT without touching the history.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, prompt: str, stream_callback=None, session_id: str = "default"):
+        self.id = next(LLMTurn._ids)
+        self.prompt = prompt
+        self.session_id = session_id
+        self.stream_callback = stream_callback
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._cancel_callbacks = []
+        self._loop = None
+        self._task = None
+
+    def __await__(self):
+        return self.run().__await__()
+
+    def _forward(self, text: str):
+        if not self.cancelled:
+            self.stream_callback(text)
+
+    async def run(self) -> tuple[str, str]:
+        with self._lock:
+            if self.cancelled:
+                return CANCELLED_RESULT
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.current_task()
+        try:
+            return await _run_query(self.prompt, self._forward if self.stream_callback else None, self.session_id)
+        except asyncio.CancelledError:
+            if not self.cancelled:
+                raise
+            # The cancellation was ours and is handled here
+            if hasattr(self._task, "uncancel"):
+                self._task.uncancel()
+            print(f"[LLM] Turn {self.id} cancelled")
+            return CANCELLED_RESULT
+        finally:
+            with self._lock:
+                self._task = None
+
+    def add_cancel_callback(self, callback):
+        """Call `callback()` when the turn is cancelled (right away if it already was)."""
+        with self._lock:
+            if not self.cancelled:
+                self._cancel_callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks, self._cancel_callbacks = self._cancel_callbacks, []
+            task, loop = self._task, self._loop
+        if task is not None:
+            loop.call_soon_threadsafe(task.cancel)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[LLM] Cancel callback error: {e}")
+
+
+def query_llm(prompt: str, stream_callback=None, session_id: str = "default") -> LLMTurn:
+    """Create the turn handle for `prompt`; await it for (text, provider), or keep it to cancel the turn."""
+    return LLMTurn(prompt, stream_callback, session_id)
+
 # Example Usage Block
 if __name__ == "__main__":
     async def main():
         response, provider = await query_llm("Tell me a joke about coding.")
         print(f"\n--- Final Output ({provider}) ---\n{response}")
 
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
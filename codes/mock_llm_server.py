@@ -0,0 +1,425 @@
+"""Local stand-in for an OpenAI-compatible chat completions server.
+
+Speaks enough of /v1/chat/completions (streaming and not) for llm_handler,
+with scriptable latency and failures, so failover and latency can be
+tested offline. Point the app at it with, for example:
+
+    python -m codes.mock_llm_server --port 8089 --ttft-ms 400 --tps 30
+    OPENROUTER_BASE_URL=http://127.0.0.1:8089/api/v1 OPENROUTER_API_KEY=mock \\
+    OLLAMA_BASE_URL=http://127.0.0.1:8090/v1 python main.py
+
+A script file (--script) gives per-request behaviour, applied in order:
+
+    {
+      "defaults": {"ttft_ms": 300, "tokens_per_second": 40, "response": "Hi there!"},
+      "requests": [
+        {"status": 429, "retry_after": 5},
+        {"status": 503},
+        {"disconnect_after_tokens": 4},
+        {"stall_after_tokens": 4, "stall_ms": 8000},
+        {"response": "A canned answer."}
+      ],
+      "loop": false
+    }
+
+Once the list is used up, requests get the defaults (or it starts over
+with "loop": true). Random failures can be injected with the --*-rate
+options; --seed makes them reproducible.
+
+The Ollama model-management endpoints /api/generate (load / unload with
+keep_alive), /api/ps and /api/tags are mocked too: with --load-ms, a
+request for a model that is not resident first pays that load time, and
+models unload once their keep_alive runs out.
+"""
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BEHAVIOUR = {
+    "ttft_ms": 300,
+    "tokens_per_second": 40.0,
+    "response": "Sure thing! This is the mock server talking, so this answer is canned. Ask me anything.",
+    "status": 200,
+    "retry_after": None,
+    "disconnect_after_tokens": None,
+    "stall_after_tokens": None,
+    "stall_ms": 10000,
+}
+
+
+def _tokens(text: str) -> list:
+    """Split text into word-sized stream tokens (whitespace stays attached)."""
+    return re.findall(r"\s*\S+", text) or [text]
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def _parse_keep_alive(value, default: float = 300.0):
+    """Ollama keep_alive ("5m", "30s", "1h", seconds, negative = forever) in seconds; None = forever."""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        match = re.fullmatch(r"\s*(-?\d+(?:\.\d+)?)\s*([smh]?)\s*", value)
+        if not match:
+            return default
+        seconds = float(match.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600}[match.group(2)]
+    else:
+        seconds = float(value)
+    return None if seconds < 0 else seconds
+
+
+class MockScript:
+    """Hands out one behaviour dict per request: scripted entries first, then random injection."""
+
+    def __init__(self, defaults: dict = None, requests: list = None, loop: bool = False,
+                 rate_429: float = 0.0, rate_5xx: float = 0.0, rate_disconnect: float = 0.0, seed: int = None):
+        self.defaults = dict(DEFAULT_BEHAVIOUR, **(defaults or {}))
+        self.requests = list(requests or [])
+        self.loop = loop
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.rate_disconnect = rate_disconnect
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.stats = {"requests": 0, "429": 0, "5xx": 0, "disconnects": 0, "stalls": 0, "completed": 0, "loads": 0}
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "MockScript":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        # Options given on the command line win over the file's defaults
+        defaults = dict(data.get("defaults", {}), **(kwargs.pop("defaults", None) or {}))
+        return cls(defaults, data.get("requests", []), data.get("loop", False), **kwargs)
+
+    def next(self) -> dict:
+        with self._lock:
+            index = self.count
+            self.count += 1
+            self.stats["requests"] += 1
+            if self.requests and (index < len(self.requests) or self.loop):
+                return dict(self.defaults, **self.requests[index % len(self.requests)])
+            behaviour = dict(self.defaults)
+            roll = self._rng.random()
+            if roll < self.rate_429:
+                behaviour["status"] = 429
+            elif roll < self.rate_429 + self.rate_5xx:
+                behaviour["status"] = 503
+            elif roll < self.rate_429 + self.rate_5xx + self.rate_disconnect:
+                behaviour["disconnect_after_tokens"] = self._rng.randint(1, 8)
+            return behaviour
+
+    def count_event(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients can measure connection reuse
+    server_version = "MockLLM/1.0"
+
+    @property
+    def script(self) -> MockScript:
+        return self.server.script
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            print(f"[MockLLM] {self.address_string()} {format % args}")
+
+    # --- helpers ---
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str, headers: dict = None):
+        self._send_json(status, {"error": {"message": message, "type": "mock_error", "code": status}}, headers)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _disconnect(self):
+        """Drop the connection mid-response, as a crashed upstream would."""
+        self.close_connection = True
+        try:
+            self.wfile.flush()
+            self.connection.shutdown(2)
+        except OSError:
+            pass
+
+    # --- routes ---
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/api/ps":
+            self._send_json(200, {"models": self.server.resident_models()})
+        elif path == "/api/tags":
+            self._send_json(200, {"models": [{"name": self.server.model, "model": self.server.model}]})
+        elif path.endswith("/models"):
+            model = self.server.model
+            self._send_json(200, {"object": "list", "data": [{"id": model, "object": "model", "owned_by": "mock"}]})
+        else:
+            self._send_error(404, f"No route for GET {self.path}")
+
+    def do_POST(self):
+        if self.path.rstrip("/") == "/api/generate":
+            self._generate(self._read_json())
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._read_json()
+            self._send_error(404, f"No route for POST {self.path}")
+            return
+        request = self._read_json()
+        behaviour = self.script.next()
+
+        status = behaviour["status"]
+        if status == 429:
+            self.script.count_event("429")
+            headers = {"Retry-After": str(behaviour["retry_after"])} if behaviour["retry_after"] is not None else {}
+            self._send_error(429, "Rate limit exceeded (mock)", headers)
+            return
+        if status >= 500:
+            self.script.count_event("5xx")
+            self._send_error(status, "Upstream error (mock)")
+            return
+
+        messages = request.get("messages", [])
+        text = behaviour["response"]
+        # Assistant prefill: continue the canned answer from where the prefix left off
+        if messages and messages[-1].get("role") == "assistant":
+            prefix = messages[-1].get("content", "").strip()
+            if text.startswith(prefix):
+                text = text[len(prefix):]
+        tokens = _tokens(text)
+        prompt_tokens = sum(_estimate_tokens(m.get("content") or "") for m in messages)
+
+        self.server.ensure_loaded(request.get("model", self.server.model), request.get("keep_alive"))
+        time.sleep(behaviour["ttft_ms"] / 1000)
+        if request.get("stream"):
+            self._stream(request, behaviour, tokens, prompt_tokens)
+        else:
+            self._complete(request, behaviour, tokens, prompt_tokens)
+
+    def _generate(self, request: dict):
+        """Ollama /api/generate; only the model-management use (no prompt) is supported."""
+        model = request.get("model", self.server.model)
+        keep_alive = _parse_keep_alive(request.get("keep_alive"))
+        if keep_alive == 0:
+            self.server.unload(model)
+            reason = "unload"
+        else:
+            self.server.ensure_loaded(model, request.get("keep_alive"))
+            reason = "load"
+        self._send_json(200, {
+            "model": model,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "response": "",
+            "done": True,
+            "done_reason": reason,
+        })
+
+    def _complete(self, request: dict, behaviour: dict, tokens: list, prompt_tokens: int):
+        tps = behaviour["tokens_per_second"]
+        if tps:
+            time.sleep(len(tokens) / tps)
+        if behaviour["disconnect_after_tokens"] is not None:
+            self.script.count_event("disconnects")
+            self._disconnect()
+            return
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", self.server.model),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens),
+            },
+        })
+        self.script.count_event("completed")
+
+    def _stream(self, request: dict, behaviour: dict, tokens: list, prompt_tokens: int):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", self.server.model)
+        created = int(time.time())
+
+        def event(delta: dict, finish_reason=None, usage=None) -> bytes:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if usage:
+                chunk["usage"] = usage
+            return f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        interval = 1.0 / behaviour["tokens_per_second"] if behaviour["tokens_per_second"] else 0.0
+        try:
+            self._write_chunk(event({"role": "assistant", "content": ""}))
+            for i, token in enumerate(tokens):
+                if behaviour["disconnect_after_tokens"] is not None and i >= behaviour["disconnect_after_tokens"]:
+                    self.script.count_event("disconnects")
+                    self._disconnect()
+                    return
+                if behaviour["stall_after_tokens"] is not None and i == behaviour["stall_after_tokens"]:
+                    self.script.count_event("stalls")
+                    time.sleep(behaviour["stall_ms"] / 1000)
+                self._write_chunk(event({"content": token}))
+                if interval:
+                    time.sleep(interval)
+            self._write_chunk(event({}, finish_reason="stop"))
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self._write_chunk(event({}, usage={
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(tokens),
+                    "total_tokens": prompt_tokens + len(tokens),
+                }))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+            self.script.count_event("completed")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away (e.g. a lost hedge race or a cancelled turn)
+            self.close_connection = True
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, script: MockScript, model: str = "mock-model", verbose: bool = False,
+                 load_ms: float = 0.0):
+        super().__init__(address, MockLLMHandler)
+        self.script = script
+        self.model = model
+        self.verbose = verbose
+        self.load_ms = load_ms
+        self._resident = {}  # model -> unload time (None = never)
+        self._load_lock = threading.Lock()
+
+    def _is_resident(self, model: str) -> bool:
+        if model not in self._resident:
+            return False
+        expires = self._resident[model]
+        if expires is not None and time.time() >= expires:
+            del self._resident[model]
+            return False
+        return True
+
+    def ensure_loaded(self, model: str, keep_alive=None) -> bool:
+        """Simulate a cold load if `model` is not resident; returns True if it had to load."""
+        seconds = _parse_keep_alive(keep_alive)
+        with self._load_lock:
+            loaded = not self._is_resident(model)
+            if loaded:
+                self.script.count_event("loads")
+                time.sleep(self.load_ms / 1000)
+            # Every request resets the unload timer, as in Ollama
+            self._resident[model] = None if seconds is None else time.time() + seconds
+        return loaded
+
+    def unload(self, model: str):
+        with self._load_lock:
+            self._resident.pop(model, None)
+
+    def resident_models(self) -> list:
+        with self._load_lock:
+            models = [m for m in list(self._resident) if self._is_resident(m)]
+            return [{
+                "name": m,
+                "model": m,
+                "expires_at": (
+                    time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self._resident[m]))
+                    if self._resident[m] is not None else "0001-01-01T00:00:00Z"
+                ),
+            } for m in models]
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_mock_server(script: MockScript = None, host: str = "127.0.0.1", port: int = 0, **kwargs) -> MockLLMServer:
+    """Start a server in a background thread (port 0 picks a free one); stop it with .shutdown()."""
+    server = MockLLMServer((host, port), script or MockScript(), **kwargs)
+    threading.Thread(target=server.serve_forever, name="mock-llm-server", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--model", default="mock-model", help="Model id reported by /v1/models")
+    parser.add_argument("--script", help="JSON file with per-request behaviour")
+    parser.add_argument("--ttft-ms", type=float, help="Time to first token")
+    parser.add_argument("--tps", type=float, help="Tokens per second (0 = as fast as possible)")
+    parser.add_argument("--response", help="Canned response text")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--rate-disconnect", type=float, default=0.0, help="Share of streams cut off mid-answer")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--load-ms", type=float, default=0.0, help="Simulated cold model load time")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    defaults = {}
+    if args.ttft_ms is not None:
+        defaults["ttft_ms"] = args.ttft_ms
+    if args.tps is not None:
+        defaults["tokens_per_second"] = args.tps
+    if args.response is not None:
+        defaults["response"] = args.response
+    injection = dict(rate_429=args.rate_429, rate_5xx=args.rate_5xx,
+                     rate_disconnect=args.rate_disconnect, seed=args.seed)
+    if args.script:
+        script = MockScript.from_file(args.script, defaults=defaults, **injection)
+    else:
+        script = MockScript(defaults, **injection)
+
+    server = MockLLMServer((args.host, args.port), script, model=args.model, verbose=args.verbose,
+                           load_ms=args.load_ms)
+    print(f"[MockLLM] Serving on {server.base_url} (model '{args.model}')")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"[MockLLM] Stats: {script.stats}")
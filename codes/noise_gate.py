@@ -0,0 +1,78 @@
+import numpy as np
+
+# --- Configuration ---
+PROP_DECREASE = 0.6     # how far noise-dominated bins are pulled down (as noisereduce's prop_decrease)
+N_STD_THRESH = 1.5      # bins this many std-devs above the noise mean (in dB) are kept
+MASK_SOFTNESS_DB = 6.0  # width of the soft transition around the threshold
+NOISE_ALPHA = 0.05      # EMA weight of each new non-speech frame in the noise profile
+MASK_SMOOTHING = 0.5    # temporal smoothing of the per-bin gain
+
+
+class StreamingNoiseGate:
+    """Frame-level stationary spectral gate with a persistent noise profile.
+
+    Each hop-sized input frame is windowed together with the previous one
+    (50% overlap, sqrt-Hann analysis and synthesis), gated against the
+    learned noise spectrum and overlap-added, so output lags input by
+    exactly one hop. The noise profile is learned from frames the caller
+    has classified as non-speech and is kept for the lifetime of the gate.
+    """
+
+    def __init__(self, hop: int):
+        self.hop = hop
+        self.n_fft = 2 * hop
+        # Periodic Hann: its square root used for analysis and synthesis sums to 1 at 50% overlap
+        hann = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self.n_fft) / self.n_fft)
+        self._window = np.sqrt(hann).astype(np.float32)
+        self._frame = np.zeros(self.n_fft, dtype=np.float32)
+        self._tail = np.zeros(hop, dtype=np.float32)
+        self._gain = np.ones(self.n_fft // 2 + 1, dtype=np.float32)
+        # (mean_db, var_db) per bin; swapped as a whole so readers never see a half update
+        self._noise = None
+        self.noise_frames = 0
+
+    @property
+    def has_profile(self) -> bool:
+        return self._noise is not None
+
+    def _spectrum_db(self, window_samples: np.ndarray) -> np.ndarray:
+        spectrum = np.fft.rfft(window_samples * self._window)
+        return 20.0 * np.log10(np.abs(spectrum) + 1e-9)
+
+    def learn(self, window_samples: np.ndarray):
+        """Fold one non-speech analysis window (n_fft float32 samples) into the noise profile."""
+        if len(window_samples) != self.n_fft:
+            return
+        db = self._spectrum_db(window_samples)
+        if self._noise is None:
+            self._noise = (db, np.full_like(db, 9.0))
+        else:
+            mean, var = self._noise
+            delta = db - mean
+            mean = mean + NOISE_ALPHA * delta
+            var = (1 - NOISE_ALPHA) * (var + NOISE_ALPHA * delta * delta)
+            self._noise = (mean, var)
+        self.noise_frames += 1
+
+    def process(self, frame: np.ndarray, out: np.ndarray):
+        """Denoise one hop of float32 input; writes the previous hop's output into `out`."""
+        self._frame[:self.hop] = self._frame[self.hop:]
+        self._frame[self.hop:] = frame
+        spectrum = np.fft.rfft(self._frame * self._window)
+
+        noise = self._noise
+        if noise is not None:
+            mean, var = noise
+            db = 20.0 * np.log10(np.abs(spectrum) + 1e-9)
+            thresh = mean + N_STD_THRESH * np.sqrt(var)
+            mask = np.clip((db - thresh) / MASK_SOFTNESS_DB + 0.5, 0.0, 1.0)
+            gain = 1.0 - PROP_DECREASE * (1.0 - mask)
+            self._gain *= MASK_SMOOTHING
+            self._gain += (1.0 - MASK_SMOOTHING) * gain
+            spectrum *= self._gain
+
+        y = np.fft.irfft(spectrum, self.n_fft).astype(np.float32)
+        y *= self._window
+        np.add(self._tail, y[:self.hop], out=out)
+        self._tail[:] = y[self.hop:]
+
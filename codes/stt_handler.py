@@ -1,40 +1,116 @@
 import os
+import json
+import multiprocessing
 from pathlib import Path
 import asyncio
 import numpy as np
 import torch
-import sounddevice as sd
 import webrtcvad
-import noisereduce as nr
 import queue
 import time
 import threading
 from typing import Optional
 
+from codes.audio_capture import SAMPLERATE, FRAME_MS, FRAME_SIZE, get_capture_engine
+from codes.endpointer import get_endpointer
+
 # --- Configuration ---
-SAMPLERATE = 16000
-FRAME_MS = 20
 BYTES_PER_SAMPLE = 2
-FRAME_SIZE = int(SAMPLERATE * FRAME_MS / 1000)
 VAD_AGGRESSIVENESS = 1
 SILENCE_THRESHOLD_MS = 1000
 MAX_BUFFER_SECONDS = 15
 MIN_STREAM_SECONDS = 0.4
 MAX_LISTEN_SECONDS = 30
+# Frames quieter than this RMS (0..1) are treated as silence without running webrtcvad
+ENERGY_GATE_RMS = float(os.getenv("STT_ENERGY_GATE_RMS", "0.002"))
+# How often the idle loop re-checks stop_event when no audio arrives (e.g. device stalled)
+STOP_POLL_SECONDS = 0.25
+# Incremental decoding while the user is still talking (only when a partial_callback is given)
+STREAMING_PARTIALS = os.getenv("STT_STREAMING_PARTIALS", "1") == "1"
+PARTIAL_INTERVAL_SECONDS = float(os.getenv("STT_PARTIAL_INTERVAL", "1.0"))
+# webrtcvad spans are reused to trim audio; Whisper's own Silero VAD pass is off unless requested
+WHISPER_VAD_FILTER = os.getenv("STT_WHISPER_VAD", "0") == "1"
+SPAN_PADDING_MS = 300
+# Named Whisper decode profiles (latency vs accuracy); "auto" picks one per utterance by duration
+DECODE_PROFILES = {
+    "fast": dict(beam_size=1, best_of=1, without_timestamps=True),
+    "balanced": dict(beam_size=3, best_of=3, without_timestamps=True),
+    "accurate": dict(beam_size=5, best_of=5, without_timestamps=False),
+}
+DECODE_PROFILE = os.getenv("STT_DECODE_PROFILE", "auto")
+FAST_PROFILE_MAX_SECONDS = 3.0
+BALANCED_PROFILE_MAX_SECONDS = 10.0
+HALLUCINATION_FILTERS = ["Thank you.", "Thanks for watching!", "You", "Bye.", ".", "MBC"]
+# Per-segment rejection from Whisper's own metadata (defaults follow Whisper's fallback thresholds)
+SEGMENT_MAX_COMPRESSION_RATIO = 2.4   # above this the text is a repetition loop
+SEGMENT_MAX_NO_SPEECH_PROB = 0.6      # ... together with a low avg_logprob: text decoded from silence
+SEGMENT_NO_SPEECH_LOGPROB = -1.0
+SEGMENT_MIN_AVG_LOGPROB = -1.5        # too unsure to be worth sending to the LLM
+# Turns whose confidence (0..1) is below this are dropped entirely
+MIN_TURN_CONFIDENCE = float(os.getenv("STT_MIN_CONFIDENCE", "0.25"))
 
 _DEFAULT_MODEL_DIR = Path(__file__).resolve().parent.parent / "models"
 _DEFAULT_MODEL_PATH = _DEFAULT_MODEL_DIR / "faster-whisper-large-v3-turbo-ct2"
 MODEL_PATH = os.getenv("WHISPER_MODEL_PATH", str(_DEFAULT_MODEL_PATH))
+SMALL_MODEL_PATH = os.getenv("WHISPER_SMALL_MODEL_PATH", str(_DEFAULT_MODEL_DIR / "faster-whisper-small-ct2"))
+
+# Model registry: name -> (local path, hub id used when the path is missing)
+MODEL_SPECS = {
+    "large": (MODEL_PATH, "deepdml/faster-whisper-large-v3-turbo-ct2"),
+    "small": (SMALL_MODEL_PATH, "Systran/faster-whisper-small"),
+}
+# Short utterances go to the small model; low-confidence results are re-decoded on the large one
+TIERED_STT = os.getenv("STT_TIERED", "1") == "1"
+# The offline CLI (python -m codes.stt_handler) decodes on the large model only and skips warmup
+_OFFLINE_CLI = __name__ == "__main__"
+if _OFFLINE_CLI:
+    TIERED_STT = False
+    os.environ["STT_TIERED"] = "0"  # inherited by a worker process spawned from here
+SMALL_MODEL_MAX_SECONDS = float(os.getenv("STT_SMALL_MAX_SECONDS", "4.0"))
+SMALL_MIN_AVG_LOGPROB = -0.7
+SMALL_MAX_NO_SPEECH_PROB = 0.5
+# CTranslate2 replicas per model; >1 lets concurrent batch jobs decode in parallel
+STT_NUM_WORKERS = int(os.getenv("STT_NUM_WORKERS", "1"))
+# Combined budget for all loaded STT models (0 = unlimited)
+STT_MEMORY_BUDGET_MB = float(os.getenv("STT_MEMORY_BUDGET_MB", "0"))
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
 compute_type = "float16" if device == "cuda" else "int8"
+DEFAULT_CPU_THREADS = min(8, os.cpu_count() or 4)
+
+# First-run benchmark of compute_type / cpu_threads; the winner is cached per model and machine
+STT_AUTOTUNE = os.getenv("STT_AUTOTUNE", "1") == "1"
+AUTOTUNE_CACHE_PATH = os.getenv("STT_AUTOTUNE_CACHE", str(_DEFAULT_MODEL_DIR / "stt_autotune.json"))
+# Optional real speech clip for tuning; a synthetic voiced clip is used otherwise
+AUTOTUNE_CLIP_PATH = os.getenv("STT_AUTOTUNE_CLIP")
+AUTOTUNE_CLIP_SECONDS = 5.0
+AUTOTUNE_RUNS = 2
+# Candidates are compared at this many decoded tokens (see _autotune)
+AUTOTUNE_TOKENS = 24
+
+# Run Whisper in a separate process (audio via shared memory) so decoding does not hold our GIL
+STT_WORKER_PROCESS = os.getenv("STT_WORKER_PROCESS", "0") == "1"
+# Only the app process delegates; the worker itself (a child process) loads the models
+_USE_WORKER = STT_WORKER_PROCESS and multiprocessing.current_process().name == "MainProcess"
+WORKER_AUDIO_SECONDS = 40
 
-# Model loaded in background thread
+# Models loaded in background thread; STT_MODEL is the large (default) model
 STT_MODEL = None
+STT_MODELS = {}
+MODEL_MEMORY_MB = {}
+MODEL_CONFIGS = {}  # name -> compute_type / cpu_threads actually loaded
+_worker_client = None
 _loading_lock = threading.Lock()
-_STT_MODEL_LOCK = threading.Lock()
+_STT_MODEL_LOCKS = {name: threading.Lock() for name in MODEL_SPECS}
 _loading_thread = None
 _status_callback = None
+# Per-turn measurements of the most recent listen call (endpointing, timings)
+LAST_TURN_METRICS = {}
+# Session-level STT measurements (load, warmup, first turn)
+STT_METRICS = {"load_seconds": None, "warmup_seconds": {}, "first_turn_seconds": None}
+# Set once the models are loaded *and* warmed up
+STT_READY = threading.Event()
+WARMUP_CLIP_SECONDS = 2.0
 
 
 def set_status_callback(callback):
@@ -43,55 +119,546 @@ def set_status_callback(callback):
     _status_callback = callback
 
 
+def _resolve_model_dir(name: str) -> str:
+    """Local directory for a registry entry, downloading from the hub if needed."""
+    path, hub_id = MODEL_SPECS[name]
+    if os.path.exists(path):
+        return path
+    from faster_whisper.utils import download_model
+
+    print(f"[STT] Model path {path} not found, using default '{hub_id}'")
+    return download_model(hub_id)
+
+
+def _estimate_model_mb(model_dir: str) -> float:
+    """Rough resident size of a CT2 model: its weight file on disk."""
+    weights = Path(model_dir) / "model.bin"
+    return weights.stat().st_size / (1024 * 1024) if weights.exists() else 0.0
+
+
+def stt_memory_usage() -> dict:
+    """Estimated memory of each loaded STT model, plus the total and budget."""
+    return {
+        "models": dict(MODEL_MEMORY_MB),
+        "total_mb": sum(MODEL_MEMORY_MB.values()),
+        "budget_mb": STT_MEMORY_BUDGET_MB or None,
+    }
+
+
+def _synthetic_clip(seconds: float, seed: int = 0) -> np.ndarray:
+    """Deterministic speech-like clip: voiced harmonics with a gliding pitch and syllable envelope."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLERATE)) / SAMPLERATE
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLERATE
+    weights = rng.uniform(0.2, 1.0, size=8)
+    voiced = sum(w / (k + 1) * np.sin((k + 1) * phase) for k, w in enumerate(weights))
+    envelope = np.clip(np.sin(2 * np.pi * 4.0 * t), 0, None) ** 0.5
+    clip = voiced * envelope + 0.01 * rng.standard_normal(len(t))
+    return (0.5 * clip / np.max(np.abs(clip))).astype(np.float32)
+
+
+def _autotune_clip() -> np.ndarray:
+    if AUTOTUNE_CLIP_PATH and os.path.exists(AUTOTUNE_CLIP_PATH):
+        from faster_whisper import decode_audio
+
+        return decode_audio(AUTOTUNE_CLIP_PATH, sampling_rate=SAMPLERATE)
+    return _synthetic_clip(AUTOTUNE_CLIP_SECONDS)
+
+
+def _autotune_candidates() -> list:
+    """(compute_type, cpu_threads) pairs worth trying on this machine."""
+    import ctranslate2
+
+    supported = ctranslate2.get_supported_compute_types(device)
+    if device == "cuda":
+        types = [t for t in ("float16", "int8_float16", "bfloat16") if t in supported]
+        return [(t, DEFAULT_CPU_THREADS) for t in types]
+    types = [t for t in ("int8", "int8_float32", "float32") if t in supported]
+    cores = os.cpu_count() or 4
+    threads = sorted({max(1, cores // 4), max(1, cores // 2), cores})
+    return [(t, n) for t in types for n in threads]
+
+
+def _load_autotune_cache() -> dict:
+    try:
+        with open(AUTOTUNE_CACHE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _timed_decode(model, clip: np.ndarray, options: dict, max_new_tokens: int) -> tuple:
+    """Best-of-AUTOTUNE_RUNS (seconds, tokens) for one capped decode."""
+    best = None
+    for _ in range(AUTOTUNE_RUNS):
+        start = time.perf_counter()
+        segments = list(model.transcribe(clip, max_new_tokens=max_new_tokens, **options)[0])
+        elapsed = time.perf_counter() - start
+        tokens = sum(len(s.tokens) for s in segments)
+        if best is None or elapsed < best[0]:
+            best = (elapsed, tokens)
+    return best
+
+
+def _autotune(model_dir: str) -> dict:
+    """Benchmark candidate configurations on the tuning clip and return the fastest.
+
+    The synthetic clip is not speech, so each compute type hallucinates a
+    different number of tokens on it, and raw decode time would mostly
+    measure that. Instead a one-token decode gives the fixed (encoder) cost,
+    a capped decode gives the cost per token, and candidates are compared
+    at AUTOTUNE_TOKENS tokens.
+    """
+    from faster_whisper import WhisperModel
+
+    clip = _autotune_clip()
+    results = []
+    for candidate_type, threads in _autotune_candidates():
+        try:
+            model = WhisperModel(model_dir, device=device, compute_type=candidate_type,
+                                 cpu_threads=threads, num_workers=1)
+            options = dict(language="en", beam_size=1, without_timestamps=True,
+                           condition_on_previous_text=False, temperature=0.0)
+            list(model.transcribe(clip[:SAMPLERATE], max_new_tokens=4, **options)[0])  # warm-up
+            fixed, _ = _timed_decode(model, clip, options, 1)
+            capped, tokens = _timed_decode(model, clip, options, AUTOTUNE_TOKENS)
+            del model
+        except Exception as e:
+            print(f"[STT] Autotune: {candidate_type}/{threads} threads failed: {e}")
+            continue
+        per_token = max(0.0, capped - fixed) / (tokens - 1) if tokens > 1 else 0.0
+        score = fixed + per_token * AUTOTUNE_TOKENS
+        print(
+            f"[STT] Autotune: {candidate_type:<13} {threads:>2} threads -> {score * 1000:.0f} ms "
+            f"(encode {fixed * 1000:.0f} ms, {per_token * 1000:.1f} ms/token over {tokens} tokens)"
+        )
+        results.append({"compute_type": candidate_type, "cpu_threads": threads, "seconds": score})
+    if not results:
+        return {}
+    return min(results, key=lambda r: r["seconds"])
+
+
+def _tuned_config(name: str, model_dir: str) -> dict:
+    """compute_type / cpu_threads for a model: cached autotune result, fresh autotune, or defaults."""
+    config = {"compute_type": compute_type, "cpu_threads": DEFAULT_CPU_THREADS}
+    if not STT_AUTOTUNE:
+        return config
+    # The token count is part of the key so results scored the old way (raw decode time) are redone
+    key = f"{name}|{model_dir}|{device}|{os.cpu_count()}|{AUTOTUNE_TOKENS}tok"
+    cache = _load_autotune_cache()
+    if key not in cache:
+        print(f"[STT] Autotuning '{name}' model (first run only)...")
+        if _status_callback:
+            _status_callback("Tuning Whisper for this machine (first run)...")
+        best = _autotune(model_dir)
+        if not best:
+            return config
+        cache[key] = best
+        try:
+            os.makedirs(os.path.dirname(AUTOTUNE_CACHE_PATH), exist_ok=True)
+            with open(AUTOTUNE_CACHE_PATH, "w", encoding="utf-8") as f:
+                json.dump(cache, f, indent=2)
+        except OSError as e:
+            print(f"[STT] Could not save autotune cache: {e}")
+    config.update(compute_type=cache[key]["compute_type"], cpu_threads=cache[key]["cpu_threads"])
+    return config
+
+
+def _load_model(name: str):
+    """Load one registry entry into STT_MODELS, respecting the shared memory budget."""
+    # Import here to avoid blocking GUI startup
+    from faster_whisper import WhisperModel
+
+    model_dir = _resolve_model_dir(name)
+    size_mb = _estimate_model_mb(model_dir)
+    used_mb = sum(MODEL_MEMORY_MB.values())
+    if STT_MEMORY_BUDGET_MB and STT_MODELS and used_mb + size_mb > STT_MEMORY_BUDGET_MB:
+        print(
+            f"[STT] Skipping '{name}' model: {used_mb + size_mb:.0f} MB would exceed "
+            f"the {STT_MEMORY_BUDGET_MB:.0f} MB budget"
+        )
+        return None
+
+    config = _tuned_config(name, model_dir)
+    model = WhisperModel(
+        model_dir,
+        device=device,
+        compute_type=config["compute_type"],
+        cpu_threads=config["cpu_threads"],
+        num_workers=STT_NUM_WORKERS
+    )
+    STT_MODELS[name] = model
+    MODEL_MEMORY_MB[name] = size_mb
+    MODEL_CONFIGS[name] = config
+    print(
+        f"[STT] Whisper '{name}' loaded ({size_mb:.0f} MB, "
+        f"{config['compute_type']}, {config['cpu_threads']} threads)"
+    )
+    return model
+
+
+def _start_worker():
+    """Spawn the STT worker process and expose its models through the registry."""
+    global _worker_client
+    from codes.stt_worker import SttWorkerClient
+
+    _worker_client = SttWorkerClient(WORKER_AUDIO_SECONDS * SAMPLERATE)
+    for name in _worker_client.start():
+        STT_MODELS[name] = _worker_client.model(name)
+    MODEL_MEMORY_MB.update(_worker_client.memory_mb)
+    MODEL_CONFIGS.update(_worker_client.configs)
+    return STT_MODELS.get("large")
+
+
 def _load_stt_model():
-    """Load STT model synchronously (runs in background thread)."""
+    """Load and warm up STT models synchronously (runs in background thread).
+
+    Only one load runs at a time: a caller that arrives while the import-time
+    load is still going (which can take minutes on a first-run autotune)
+    waits for it rather than loading a second set of models.
+    """
+    with _loading_lock:
+        if STT_MODEL is None:
+            _load_and_warm_up()
+
+
+def _load_and_warm_up():
     global STT_MODEL
-    if STT_MODEL is not None:
+    start = time.perf_counter()
+    if _USE_WORKER:
+        try:
+            STT_MODEL = _start_worker()
+        except Exception as e:
+            print(f"Error starting STT worker process: {e}")
+            STT_MODEL = None
+    else:
+        try:
+            STT_MODEL = _load_model("large")
+            print("Whisper large-v3-turbo loaded successfully!")
+        except Exception as e:
+            print(f"Error loading Whisper model: {e}")
+            STT_MODEL = None
+
+        if STT_MODEL is not None and TIERED_STT:
+            try:
+                _load_model("small")
+            except Exception as e:
+                print(f"[STT] Small model unavailable, using large model only: {e}")
+    if STT_MODEL is None:
         return
-    try:
-        # Import here to avoid blocking GUI startup
-        from faster_whisper import WhisperModel
-        
-        model_arg = str(MODEL_PATH)
-        if not os.path.exists(model_arg):
-            print(f"[STT] Model path {model_arg} not found, using default 'deepdml/faster-whisper-large-v3-turbo-ct2'")
-            model_arg = "deepdml/faster-whisper-large-v3-turbo-ct2"
-
-        STT_MODEL = WhisperModel(
-            model_arg,
-            device=device,
-            compute_type=compute_type,
-            cpu_threads=8,
-            num_workers=1
-        )
-        print("Whisper large-v3-turbo loaded successfully!")
+    STT_METRICS["load_seconds"] = time.perf_counter() - start
+
+    # The worker process gets warmed up by the app process, through its proxies
+    if multiprocessing.current_process().name == "MainProcess" and not _OFFLINE_CLI:
         if _status_callback:
-            _status_callback("Whisper loaded successfully")
-    except Exception as e:
-        print(f"Error loading Whisper model: {e}")
-        STT_MODEL = None
+            _status_callback("Whisper loaded, warming up...")
+        _warmup_models()
+    STT_READY.set()
+    if _status_callback:
+        _status_callback("Whisper ready")
 
 
-# Start loading immediately on import
-print("Loading models")
-_loading_thread = threading.Thread(target=_load_stt_model, daemon=True)
-_loading_thread.start()
+def _warmup_models():
+    """Decode a short synthetic clip on every loaded model.
+
+    The first transcribe call pays for allocator and kernel setup inside
+    CTranslate2; doing it here keeps that cost off the user's first turn.
+    Greedy and beam search take different paths, so both are exercised.
+    """
+    clip = _synthetic_clip(WARMUP_CLIP_SECONDS, seed=1)
+    for name in list(STT_MODELS):
+        start = time.perf_counter()
+        try:
+            for profile in ("fast", "accurate"):
+                _decode(clip.copy(), profile, model=name)
+        except Exception as e:
+            print(f"[STT] Warmup of '{name}' model failed: {e}")
+            continue
+        elapsed = time.perf_counter() - start
+        STT_METRICS["warmup_seconds"][name] = elapsed
+        print(f"[STT] Warmed up '{name}' model in {elapsed:.2f} s")
+
+
+def is_ready() -> bool:
+    """True once the STT models are loaded and warmed up."""
+    return STT_READY.is_set()
 
 
 async def ensure_stt_model_loaded():
     """Ensure STT model is loaded (lazy load in background thread)."""
-    global STT_MODEL
     if STT_MODEL is not None:
         return
-    loop = asyncio.get_running_loop()
-    with _loading_lock:
-        if STT_MODEL is not None:
-            return
-        await loop.run_in_executor(None, _load_stt_model)
+    # Waits for a load already in progress, or retries one that failed
+    await asyncio.get_running_loop().run_in_executor(None, _load_stt_model)
+
+
+def _to_float(audio_int16: np.ndarray) -> np.ndarray:
+    """Single conversion (and copy) of int16 PCM out of the capture ring into float32."""
+    return np.multiply(audio_int16, 1.0 / 32768.0, dtype=np.float32)
+
+
+def _utterance_audio(engine, start_pos: int, end_pos: int) -> np.ndarray:
+    """Copy an utterance out of the capture ring as float32.
+
+    Uses the already-denoised ring when noise suppression is on, so no
+    noise reduction is left to do after the endpoint.
+    """
+    if engine.noise_gate is not None:
+        return np.array(engine.read(start_pos, min(end_pos, engine.denoised_pos), denoised=True))
+    return _to_float(engine.read(start_pos, end_pos))
+
+
+def _preprocess(audio_float: np.ndarray) -> Optional[np.ndarray]:
+    """Peak-normalise float32 audio in place.
+
+    Returns None if the audio is too quiet to be worth transcribing.
+    """
+    max_amp = float(np.max(np.abs(audio_float))) if len(audio_float) else 0.0
+    if max_amp <= 0.01: # Amplitude threshold
+        return None
+    audio_float *= 1.0 / (max_amp + 1e-6)
+    return audio_float
+
+
+def _trim_to_spans(audio: np.ndarray, spans: list, offset: int = 0) -> np.ndarray:
+    """Keep only the (padded) speech spans found by the capture loop's VAD.
+
+    `spans` are (start, end) sample ranges relative to the start of the
+    utterance; `audio` starts at sample `offset` of that utterance. Long
+    pauses between spans are cut down to the padding, which is what the
+    in-Whisper VAD filter would otherwise do.
+    """
+    pad = int(SPAN_PADDING_MS * SAMPLERATE / 1000)
+    merged = []
+    for start, end in spans:
+        start = max(0, start - pad - offset)
+        end = min(len(audio), end + pad - offset)
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    if not merged:
+        return audio
+    if len(merged) == 1:
+        start, end = merged[0]
+        return audio[start:end]
+    return np.concatenate([audio[start:end] for start, end in merged])
+
+
+def select_decode_profile(duration_s: float) -> str:
+    """Pick a decode profile: pinned via STT_DECODE_PROFILE, otherwise by utterance length."""
+    if DECODE_PROFILE in DECODE_PROFILES:
+        return DECODE_PROFILE
+    if duration_s <= FAST_PROFILE_MAX_SECONDS:
+        return "fast"
+    if duration_s <= BALANCED_PROFILE_MAX_SECONDS:
+        return "balanced"
+    return "accurate"
+
+
+def _decode(audio_float: np.ndarray, profile: Optional[str] = None, model: str = "large", **options) -> list:
+    """Run Whisper on float32 audio and materialise the segment generator.
+
+    `profile` names an entry of DECODE_PROFILES (chosen from the audio
+    duration when omitted); explicit options override it. `model` names a
+    loaded registry entry. Blocking; call it from an executor. Decodes on
+    one model are serialised because it is shared between the live path
+    and incremental partials.
+    """
+    if profile is None:
+        profile = select_decode_profile(len(audio_float) / SAMPLERATE)
+    params = dict(
+        language="en",
+        vad_filter=WHISPER_VAD_FILTER,
+        condition_on_previous_text=False,
+        temperature=0.0,
+    )
+    params.update(DECODE_PROFILES[profile])
+    if params["vad_filter"]:
+        params["vad_parameters"] = dict(min_silence_duration_ms=500)
+    params.update(options)
+    with _STT_MODEL_LOCKS[model]:
+        segments, _ = STT_MODELS[model].transcribe(audio_float, **params)
+        return list(segments)
+
+
+def _is_confident(segments: list) -> bool:
+    """Whether a small-model result can be trusted without a large-model pass."""
+    if not segments:
+        return True
+    text = "".join(s.text for s in segments).strip()
+    no_speech = max(s.no_speech_prob for s in segments)
+    if text and no_speech > SMALL_MAX_NO_SPEECH_PROB:
+        return False
+    return min(s.avg_logprob for s in segments) >= SMALL_MIN_AVG_LOGPROB
+
+
+def _decode_routed(audio_float: np.ndarray, profile: Optional[str] = None, **options) -> tuple:
+    """Decode on the small model for short audio, escalating to the large model when unsure.
+
+    Returns (segments, model name). Blocking; call it from an executor.
+    """
+    if "small" in STT_MODELS and len(audio_float) / SAMPLERATE <= SMALL_MODEL_MAX_SECONDS:
+        segments = _decode(audio_float, profile, model="small", **options)
+        if _is_confident(segments):
+            return segments, "small"
+        print("[STT] Low confidence on small model, re-decoding with large model")
+    return _decode(audio_float, profile, model="large", **options), "large"
+
+
+def _segment_confidence(segment) -> float:
+    """0..1 score: mean token probability, discounted by the no-speech probability."""
+    return float(np.exp(segment.avg_logprob)) * (1.0 - segment.no_speech_prob)
+
+
+def _is_hallucinated(segment) -> bool:
+    if segment.compression_ratio > SEGMENT_MAX_COMPRESSION_RATIO:
+        return True
+    if segment.no_speech_prob > SEGMENT_MAX_NO_SPEECH_PROB and segment.avg_logprob < SEGMENT_NO_SPEECH_LOGPROB:
+        return True
+    return segment.avg_logprob < SEGMENT_MIN_AVG_LOGPROB
+
+
+def _reject_segments(segments: list) -> tuple:
+    """Drop hallucinated segments before their text is joined.
+
+    Returns (kept segments, confidence), where confidence is the
+    duration-weighted segment confidence over *all* segments, so a turn
+    made mostly of rejected audio scores low. None if there were no segments.
+    """
+    kept = []
+    total = weight = 0.0
+    for segment in segments:
+        duration = max(segment.end - segment.start, 0.01)
+        total += _segment_confidence(segment) * duration
+        weight += duration
+        if _is_hallucinated(segment):
+            print(
+                f"[STT] Rejected segment {segment.text.strip()!r} "
+                f"(no_speech={segment.no_speech_prob:.2f}, logprob={segment.avg_logprob:.2f}, "
+                f"compression={segment.compression_ratio:.2f})"
+            )
+        else:
+            kept.append(segment)
+    return kept, (total / weight if weight else None)
+
+
+def _filter_hallucinations(text: str) -> str:
+    text = text.strip()
+    if text in HALLUCINATION_FILTERS or len(text) < 2:
+        return ""
+    return text
+
+
+def _normalize_word(word: str) -> str:
+    return word.strip().strip(".,!?;:\"'").lower()
+
+
+class IncrementalTranscriber:
+    """Streaming decoder with a LocalAgreement-2 commit policy.
+
+    The growing utterance is re-decoded from the end of the last committed
+    word; words that two consecutive hypotheses agree on are committed and
+    never revised. At the endpoint only the uncommitted tail is decoded.
+    Partials and the tail go through the same tier policy as whole turns
+    (`_decode_routed`), so a short window is decoded on the small model.
+    """
+
+    def __init__(self):
+        self.committed = []  # [(start_s, end_s, word)] in utterance time
+        self.previous = []   # uncommitted words of the last hypothesis
+        self.offset = 0      # first sample not covered by committed words
+        self._score = 0.0    # duration-weighted confidence of the decoded audio
+        self._scored_seconds = 0.0
+        self.decode_profile = None  # of the last decode, for LAST_TURN_METRICS
+        self.stt_model = None
+        self.partial_decodes = {}  # model name -> partial decodes run on it
+
+    def _add_confidence(self, confidence: Optional[float], seconds: float):
+        if confidence is not None and seconds > 0:
+            self._score += confidence * seconds
+            self._scored_seconds += seconds
+
+    @property
+    def confidence(self) -> Optional[float]:
+        """Confidence of the transcript so far (committed words and final tail)."""
+        return self._score / self._scored_seconds if self._scored_seconds else None
+
+    @property
+    def committed_text(self) -> str:
+        return "".join(w for _, _, w in self.committed).strip()
+
+    @property
+    def hypothesis_text(self) -> str:
+        """Committed text plus the latest (not yet agreed) words."""
+        return "".join(w for _, _, w in self.committed + self.previous).strip()
+
+    def _prompt(self) -> Optional[str]:
+        # Last few committed words keep the decoder consistent across windows
+        return self.committed_text[-200:] or None
+
+    def update(self, audio: np.ndarray) -> str:
+        """Decode a new hypothesis (blocking) and return the committed text.
+
+        `audio` is the float32 utterance so far; it is modified in place.
+        """
+        audio_float = _preprocess(audio[self.offset:])
+        if audio_float is None:
+            return self.committed_text
+        base = self.offset / SAMPLERATE
+        segments, model_name = _decode_routed(
+            audio_float,
+            "fast",
+            vad_filter=False,
+            word_timestamps=True,
+            initial_prompt=self._prompt(),
+        )
+        self.decode_profile, self.stt_model = "fast", model_name
+        self.partial_decodes[model_name] = self.partial_decodes.get(model_name, 0) + 1
+        segments, confidence = _reject_segments(segments)
+        words = [
+            (base + w.start, base + w.end, w.word)
+            for seg in segments
+            for w in (seg.words or [])
+        ]
+
+        agreed = 0
+        while (
+            agreed < min(len(words), len(self.previous))
+            and _normalize_word(words[agreed][2]) == _normalize_word(self.previous[agreed][2])
+        ):
+            agreed += 1
+
+        if agreed:
+            self.committed.extend(words[:agreed])
+            self._add_confidence(confidence, words[agreed - 1][1] - base)
+            self.offset = min(len(audio), int(words[agreed - 1][1] * SAMPLERATE))
+        self.previous = words[agreed:]
+        return self.committed_text
+
+    def finalize(self, audio: np.ndarray, spans: Optional[list] = None) -> str:
+        """Decode the uncommitted tail (blocking) and return the full transcript."""
+        tail = audio[self.offset:]
+        if spans:
+            tail = _trim_to_spans(tail, spans, self.offset)
+        tail_text = ""
+        if len(tail) > int(0.3 * SAMPLERATE):
+            audio_float = _preprocess(tail)
+            if audio_float is not None:
+                profile = select_decode_profile(len(audio_float) / SAMPLERATE)
+                segments, model_name = _decode_routed(audio_float, profile, initial_prompt=self._prompt())
+                self.decode_profile, self.stt_model = profile, model_name
+                segments, confidence = _reject_segments(segments)
+                self._add_confidence(confidence, len(tail) / SAMPLERATE)
+                tail_text = " ".join(s.text.strip() for s in segments)
+        return f"{self.committed_text} {tail_text}".strip()
 
 
 async def whisper_streaming_advanced(
-    amplitude_queue: queue.Queue,
+    amplitude_queue: Optional[queue.Queue] = None,
     stop_event: Optional[threading.Event] = None,
     partial_callback=None,
     final_callback=None,
@@ -101,7 +668,11 @@ async def whisper_streaming_advanced(
     1. Listens for speech (VAD).
     2. Records until silence.
     3. Transcribes final audio.
-    No partial streaming to prevent hallucinations/lag.
+    If a partial_callback is given (and STT_STREAMING_PARTIALS is on), the
+    utterance is re-decoded while the user talks and stable (committed)
+    text is sent to partial_callback; only the tail is decoded at the end.
+    Input levels are published on level_meter.MIC_LEVELS; amplitude_queue
+    is still fed if given, for older callers.
     """
     # Ensure model is loaded before use
     await ensure_stt_model_loaded()
@@ -111,141 +682,192 @@ async def whisper_streaming_advanced(
         return "Error: STT model not loaded."
 
     vad = webrtcvad.Vad(2) # Increased aggressiveness (2)
-    audio_data_queue = queue.Queue()
-
-    # ------------- Sounddevice Callback ---------------
-    def sd_callback(indata, frames, time_info, status):
-        # indata is int16
-        amp = float(np.sqrt(np.mean(indata.astype(np.float32)**2))) / 32768.0
-        amplitude_queue.put(amp)
-        audio_data_queue.put(indata.copy())
 
     # ----------------------------------------------------
     # RECORDING LOOP
     # ----------------------------------------------------
-    buffer = []
+    # The utterance lives in the capture ring buffer as [utterance_start, utterance_end)
     speech_started = False
-    silent_frames = 0
-    # 1000ms silence to stop
-    max_silent = int(1000 / FRAME_MS) 
-    
-    stream = sd.InputStream(
-        samplerate=SAMPLERATE,
-        channels=1,
-        dtype="int16",
-        blocksize=FRAME_SIZE,
-        callback=sd_callback,
-    )
+    # Speech spans found by webrtcvad, as absolute ring positions [start, end)
+    spans = []
+    # Adaptive silence cutoff (replaces a fixed 1000ms hangover)
+    endpointer = get_endpointer(FRAME_MS)
+    endpointer.begin_turn()
+    preroll_samples = int(500 / FRAME_MS) * FRAME_SIZE
+    max_samples = MAX_LISTEN_SECONDS * SAMPLERATE
+
+    loop = asyncio.get_running_loop()
+    transcriber = IncrementalTranscriber() if (partial_callback and STREAMING_PARTIALS) else None
+    partial_task = None
+    partial_samples = int(PARTIAL_INTERVAL_SECONDS * SAMPLERATE)
+    last_partial_end = 0
+    last_partial_text = ""
+
+    def on_partial_done(task):
+        nonlocal last_partial_text
+        if task.cancelled() or task.exception():
+            return
+        endpointer.set_partial_text(transcriber.hypothesis_text)
+        text = task.result()
+        if text and text != last_partial_text:
+            last_partial_text = text
+            partial_callback(text)
+
+    # Attach to the always-on capture stream; pre-roll is already buffered.
+    engine = get_capture_engine()
+    subscription = engine.attach(amplitude_queue)
+    audio_frames = subscription.frames
+    utterance_start = utterance_end = subscription.start_pos
 
     print("[STT] Listening (VAD Mode)...")
 
-    with stream:
-        while True:
-            if stop_event and stop_event.is_set():
-                break
+    with subscription:
+        while not (stop_event and stop_event.is_set()):
+            # Sleep until the capture thread hands us the next frame
+            try:
+                end_pos, rms = await asyncio.wait_for(audio_frames.get(), STOP_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                continue
+            utterance_end = end_pos
 
-            while not audio_data_queue.empty():
-                frame = audio_data_queue.get()
-                if frame.ndim == 2:
-                    frame_mono = frame[:, 0]
+            # Cheap energy gate: skip webrtcvad on obvious silence
+            is_speech = rms >= ENERGY_GATE_RMS and vad.is_speech(
+                engine.frame(end_pos).tobytes(), SAMPLERATE
+            )
+
+            if is_speech:
+                if spans and spans[-1][1] == end_pos - FRAME_SIZE:
+                    spans[-1][1] = end_pos
                 else:
-                    frame_mono = frame
-                
-                is_speech = vad.is_speech(frame_mono.tobytes(), SAMPLERATE)
-
-                if not speech_started:
-                    # WAITING FOR SPEECH
-                    if is_speech:
-                        print("[STT] Speech detected - Recording...")
-                        speech_started = True
-                        buffer.append(frame_mono)
-                        silent_frames = 0
-                    else:
-                        # Keep a small rolling buffer of pre-speech audio (0.5s)
-                        buffer.append(frame_mono)
-                        if len(buffer) > int(500 / FRAME_MS):
-                            buffer.pop(0)
+                    spans.append([end_pos - FRAME_SIZE, end_pos])
+
+            if not speech_started:
+                # WAITING FOR SPEECH
+                if is_speech:
+                    print("[STT] Speech detected - Recording...")
+                    speech_started = True
+                    endpointer.update(True)
+                    last_partial_end = end_pos
                 else:
-                    # RECORDING
-                    buffer.append(frame_mono)
-                    if is_speech:
-                        silent_frames = 0
-                    else:
-                        silent_frames += 1
-                    
-                    # Stop on silence
-                    if silent_frames > max_silent:
-                        print("[STT] Silence detected - Processing...")
-                        stop_event.set() # Break outer loop
-                        break
-                    
-                    # Stop on max duration (30s)
-                    if len(buffer) * FRAME_MS > 30000:
-                        print("[STT] Max duration - Processing...")
-                        stop_event.set()
-                        break
-            
-            if stop_event.is_set():
+                    # Keep a small rolling window of pre-speech audio (0.5s)
+                    utterance_start = max(utterance_start, end_pos - preroll_samples)
+                    engine.learn_noise(end_pos)
+                continue
+
+            # RECORDING
+            if not is_speech:
+                engine.learn_noise(end_pos)
+
+            # Stop on silence
+            if endpointer.update(is_speech):
+                turn_metrics = endpointer.metrics()
+                print(
+                    f"[STT] Silence detected - Processing... "
+                    f"(endpoint after {turn_metrics['endpoint_delay_ms']} ms, "
+                    f"hangover {turn_metrics['hangover_ms']} ms)"
+                )
+                break
+
+            # Stop on max duration (30s)
+            if utterance_end - utterance_start > max_samples:
+                print("[STT] Max duration - Processing...")
                 break
-            
-            await asyncio.sleep(0.005)
+
+            # Re-decode the growing window in the background (one at a time)
+            if (
+                transcriber
+                and (partial_task is None or partial_task.done())
+                and end_pos - last_partial_end >= partial_samples
+            ):
+                last_partial_end = end_pos
+                snapshot = _utterance_audio(engine, utterance_start, utterance_end)
+                partial_task = loop.run_in_executor(None, transcriber.update, snapshot)
+                partial_task.add_done_callback(on_partial_done)
+
+    if stop_event:
+        stop_event.set()
+    LAST_TURN_METRICS.clear()
+    if speech_started:
+        LAST_TURN_METRICS.update(endpointer.metrics())
 
     # ----------------------------------------------------
     # TRANSCRIPTION
     # ----------------------------------------------------
     final_text = ""
-    if len(buffer) > int(1000 / FRAME_MS): # Only transcribe if > 1s audio
+    if partial_task is not None:
         try:
-            audio_np = np.concatenate(buffer)
-            audio_float = audio_np.astype(np.float32) / 32768.0
-            
-            # Noise reduction
-            audio_float = nr.reduce_noise(y=audio_float, sr=SAMPLERATE, prop_decrease=0.6)
-            
-            # Normalize
-            max_amp = np.max(np.abs(audio_float))
-            if max_amp > 0.01: # Amplitude threshold
-                audio_float = audio_float / (max_amp + 1e-6)
-                
-                loop = asyncio.get_running_loop()
-                segments, _ = await loop.run_in_executor(
-                    None,
-                    lambda: STT_MODEL.transcribe(
-                        audio_float,
-                        language="en",
-                        beam_size=5,
-                        vad_filter=True,
-                        vad_parameters=dict(min_silence_duration_ms=500),
-                        condition_on_previous_text=False,
-                        temperature=0.0
-                    )
+            await partial_task
+        except Exception as e:
+            print(f"[STT] Partial decode error: {e}")
+
+    if utterance_end - utterance_start > SAMPLERATE: # Only transcribe if > 1s audio
+        decode_start = time.perf_counter()
+        confidence = None
+        try:
+            # One copy out of the ring, before the capture thread can overwrite it
+            audio_float = _utterance_audio(engine, utterance_start, utterance_end)
+            speech_spans = [(start - utterance_start, end - utterance_start) for start, end in spans]
+            if transcriber:
+                final_text = await loop.run_in_executor(
+                    None, transcriber.finalize, audio_float, speech_spans
                 )
-                
-                final_text = " ".join([s.text for s in segments]).strip()
-                
-                # Hallucination filters
-                filters = ["Thank you.", "Thanks for watching!", "You", "Bye.", ".", "MBC"]
-                if final_text in filters or len(final_text) < 2:
-                    final_text = ""
+                confidence = transcriber.confidence
+                # Same keys as the non-streaming path: the last decode's profile and model
+                if transcriber.stt_model is not None:
+                    LAST_TURN_METRICS["decode_profile"] = transcriber.decode_profile
+                    LAST_TURN_METRICS["stt_model"] = transcriber.stt_model
+                LAST_TURN_METRICS["partial_decodes"] = dict(transcriber.partial_decodes)
             else:
-                print("[STT] Audio too quiet, ignoring.")
+                audio_float = _preprocess(_trim_to_spans(audio_float, speech_spans))
+                if audio_float is not None:
+                    profile = select_decode_profile(len(audio_float) / SAMPLERATE)
+                    LAST_TURN_METRICS["decode_profile"] = profile
+                    segments, model_name = await loop.run_in_executor(
+                        None, lambda: _decode_routed(audio_float, profile)
+                    )
+                    LAST_TURN_METRICS["stt_model"] = model_name
+                    segments, confidence = _reject_segments(segments)
+                    final_text = " ".join([s.text for s in segments]).strip()
+                else:
+                    print("[STT] Audio too quiet, ignoring.")
+
+            # Hallucination filters
+            if confidence is not None:
+                LAST_TURN_METRICS["confidence"] = round(confidence, 3)
+                if final_text and confidence < MIN_TURN_CONFIDENCE:
+                    print(f"[STT] Low-confidence turn ({confidence:.2f}), ignoring: {final_text!r}")
+                    final_text = ""
+            final_text = _filter_hallucinations(final_text)
 
         except Exception as e:
             print(f"[STT] Error: {e}")
 
+        transcribe_seconds = time.perf_counter() - decode_start
+        LAST_TURN_METRICS["transcribe_ms"] = round(transcribe_seconds * 1000)
+        if STT_METRICS["first_turn_seconds"] is None:
+            STT_METRICS["first_turn_seconds"] = transcribe_seconds
+            print(f"[STT] First turn transcribed in {transcribe_seconds:.2f} s")
+
     if final_callback and final_text:
         final_callback(final_text)
     
     # Clear queues
-    with amplitude_queue.mutex:
-        amplitude_queue.queue.clear()
+    if amplitude_queue is not None:
+        with amplitude_queue.mutex:
+            amplitude_queue.queue.clear()
     
     return final_text
 
 
+# Start loading immediately on import
+print("Loading models")
+_loading_thread = threading.Thread(target=_load_stt_model, daemon=True)
+_loading_thread.start()
+
+
 # Legacy alias for backward compatibility
 async def listen_and_transcribe(
-    audio_queue: queue.Queue, stop_event: Optional[threading.Event] = None
+    audio_queue: Optional[queue.Queue] = None, stop_event: Optional[threading.Event] = None
 ) -> str:
     """Legacy wrapper for backward compatibility."""
     return await whisper_streaming_advanced(
@@ -254,3 +876,224 @@ async def listen_and_transcribe(
         partial_callback=None,
         final_callback=None
     )
+
+
+# ----------------------------------------------------
+# OFFLINE TOOLS
+# ----------------------------------------------------
+AUDIO_EXTENSIONS = (".wav", ".flac", ".mp3", ".ogg", ".m4a")
+BATCH_SIZE = int(os.getenv("STT_BATCH_SIZE", "8"))
+
+
+def _config_label(name: str = "large") -> str:
+    """Device and tuned configuration a model was actually loaded with, for reports."""
+    config = MODEL_CONFIGS.get(name)
+    if not config:
+        return device
+    return f"{device}/{config['compute_type']}, {config['cpu_threads']} threads"
+
+
+def _load_corpus(corpus_dir: str) -> list:
+    """Load every audio file in `corpus_dir` as (name, float32 audio, reference text or None).
+
+    A reference transcript is read from a `.txt` file with the same stem.
+    """
+    from faster_whisper import decode_audio
+
+    corpus = []
+    for path in sorted(Path(corpus_dir).iterdir()):
+        if path.suffix.lower() not in AUDIO_EXTENSIONS:
+            continue
+        ref_path = path.with_suffix(".txt")
+        reference = ref_path.read_text(encoding="utf-8").strip() if ref_path.exists() else None
+        corpus.append((path.name, decode_audio(str(path), sampling_rate=SAMPLERATE), reference))
+    return corpus
+
+
+def _normalize_transcript(text: str) -> list:
+    return [w for w in (_normalize_word(t) for t in text.split()) if w]
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref, hyp = _normalize_transcript(reference), _normalize_transcript(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            cur = min(row[j] + 1, row[j - 1] + 1, prev + (r != h))
+            prev, row[j] = row[j], cur
+    return row[-1] / len(ref)
+
+
+def benchmark_profiles(corpus_dir: str, profiles: Optional[list] = None) -> dict:
+    """Decode a WAV corpus with each profile; report real-time factor and WER."""
+    _loading_thread.join()
+    if not STT_MODEL:
+        raise RuntimeError("STT model not loaded")
+    corpus = _load_corpus(corpus_dir)
+    if not corpus:
+        raise RuntimeError(f"No audio files found in {corpus_dir}")
+    total_audio = sum(len(audio) for _, audio, _ in corpus) / SAMPLERATE
+
+    results = {}
+    for profile in profiles or list(DECODE_PROFILES):
+        decode_time = 0.0
+        errors, ref_words = 0.0, 0
+        for name, audio, reference in corpus:
+            prepared = _preprocess(audio.copy())
+            start = time.perf_counter()
+            segments = _decode(prepared if prepared is not None else audio, profile)
+            decode_time += time.perf_counter() - start
+            if reference:
+                n = len(_normalize_transcript(reference))
+                errors += word_error_rate(reference, " ".join(s.text for s in segments)) * n
+                ref_words += n
+        results[profile] = {
+            "rtf": decode_time / total_audio,
+            "wer": errors / ref_words if ref_words else None,
+            "decode_seconds": decode_time,
+        }
+
+    print(f"\n{len(corpus)} files, {total_audio:.1f} s of audio ({_config_label()})")
+    print(f"{'profile':<10} {'RTF':>8} {'WER':>8} {'decode s':>10}")
+    for profile, r in results.items():
+        wer = f"{r['wer'] * 100:.1f}%" if r["wer"] is not None else "n/a"
+        print(f"{profile:<10} {r['rtf']:>8.3f} {wer:>8} {r['decode_seconds']:>10.2f}")
+    return results
+
+
+def _transcribe_file(pipeline, path: Path, params: dict) -> dict:
+    """Decode one file for the batch CLI; returns its JSONL record."""
+    from faster_whisper import decode_audio
+
+    start = time.perf_counter()
+    audio = decode_audio(str(path), sampling_rate=SAMPLERATE)
+    segments, info = pipeline.transcribe(audio, **params)
+    segments, confidence = _reject_segments(list(segments))
+    return {
+        "file": str(path),
+        "duration": len(audio) / SAMPLERATE,
+        # The worker-process proxy returns no info
+        "language": info.language if info else params.get("language"),
+        "language_probability": round(info.language_probability, 3) if info else None,
+        "confidence": round(confidence, 3) if confidence is not None else None,
+        "text": " ".join(s.text.strip() for s in segments).strip(),
+        "segments": [
+            {"start": round(s.start, 2), "end": round(s.end, 2), "text": s.text.strip()}
+            for s in segments
+        ],
+        "decode_seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def transcribe_directory(
+    input_dir: str,
+    output_path: str,
+    jobs: int = 2,
+    batch_size: int = BATCH_SIZE,
+    profile: str = "balanced",
+    language: Optional[str] = "en",
+    recursive: bool = False,
+) -> dict:
+    """Transcribe every audio file under `input_dir` into a JSONL file.
+
+    Each file is split into VAD chunks that are decoded `batch_size` at a
+    time by faster-whisper's BatchedInferencePipeline on the already loaded
+    large model; `jobs` files are in flight at once, so audio decoding and
+    chunking of one file overlap inference on another. Set STT_NUM_WORKERS
+    to `jobs` to let the inference itself run in parallel as well.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+    _loading_thread.join()
+    model = STT_MODELS.get("large")
+    if model is None:
+        raise RuntimeError("STT model not loaded")
+    pattern = "**/*" if recursive else "*"
+    files = sorted(p for p in Path(input_dir).glob(pattern) if p.suffix.lower() in AUDIO_EXTENSIONS)
+    if not files:
+        raise RuntimeError(f"No audio files found in {input_dir}")
+
+    params = dict(language=language, condition_on_previous_text=False, temperature=0.0)
+    params.update(DECODE_PROFILES[profile])
+    if isinstance(model, WhisperModel):
+        pipeline = BatchedInferencePipeline(model=model)
+        params["batch_size"] = batch_size
+    else:
+        # Worker-process proxy: batching happens per request on the worker's model
+        print("[STT] Models live in the worker process; decoding files without batching")
+        pipeline = model
+        params["vad_filter"] = True
+
+    print(f"[STT] Transcribing {len(files)} files with {jobs} jobs, batch size {batch_size}")
+    audio_seconds = 0.0
+    failed = 0
+    start = time.perf_counter()
+    with open(output_path, "w", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(_transcribe_file, pipeline, path, params): path for path in files}
+        for done, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                record = future.result()
+                audio_seconds += record["duration"]
+            except Exception as e:
+                record = {"file": str(path), "error": f"{type(e).__name__}: {e}"}
+                failed += 1
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            print(f"[STT] {done}/{len(files)} {path.name}" + (" (failed)" if "error" in record else ""))
+    wall = time.perf_counter() - start
+
+    summary = {
+        "files": len(files),
+        "failed": failed,
+        "audio_hours": audio_seconds / 3600,
+        "wall_seconds": wall,
+        "audio_hours_per_hour": audio_seconds / wall if wall else 0.0,
+        "device": device,
+        "model_config": MODEL_CONFIGS.get("large"),
+    }
+    print(
+        f"\n{len(files) - failed}/{len(files)} files, {audio_seconds / 3600:.2f} h of audio in {wall:.1f} s "
+        f"-> {summary['audio_hours_per_hour']:.1f} audio-hours/hour ({_config_label()})"
+    )
+    print(f"Transcripts written to {output_path}")
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline STT tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bench = commands.add_parser("bench", help="Compare decode profiles on a WAV corpus (RTF / WER)")
+    bench.add_argument("corpus_dir", help="Directory of audio files with optional <name>.txt references")
+    bench.add_argument("--profiles", nargs="+", choices=list(DECODE_PROFILES), default=None)
+
+    transcribe = commands.add_parser("transcribe", help="Batch-transcribe a directory of audio files to JSONL")
+    transcribe.add_argument("input_dir", help="Directory of audio files")
+    transcribe.add_argument("-o", "--output", default="transcripts.jsonl", help="JSONL output path")
+    transcribe.add_argument("-j", "--jobs", type=int, default=2, help="Files decoded concurrently")
+    transcribe.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Chunks per batched inference call")
+    transcribe.add_argument("--profile", choices=list(DECODE_PROFILES), default="balanced")
+    transcribe.add_argument("--language", default="en", help="Language code, or 'auto' to detect per file")
+    transcribe.add_argument("-r", "--recursive", action="store_true", help="Include subdirectories")
+
+    args = parser.parse_args()
+    if args.command == "bench":
+        benchmark_profiles(args.corpus_dir, args.profiles)
+    elif args.command == "transcribe":
+        transcribe_directory(
+            args.input_dir,
+            args.output,
+            jobs=args.jobs,
+            batch_size=args.batch_size,
+            profile=args.profile,
+            language=None if args.language == "auto" else args.language,
+            recursive=args.recursive,
+        )
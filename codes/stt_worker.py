@@ -0,0 +1,172 @@
+import atexit
+import multiprocessing as mp
+import threading
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+
+import numpy as np
+
+WORKER_PROCESS_NAME = "stt-worker"
+# How often start() checks that the worker is still alive while it loads
+STARTUP_POLL_SECONDS = 1.0
+
+
+def _segment_to_dict(segment) -> dict:
+    words = None
+    if segment.words:
+        words = [
+            {"start": w.start, "end": w.end, "word": w.word, "probability": w.probability}
+            for w in segment.words
+        ]
+    return {
+        "start": segment.start,
+        "end": segment.end,
+        "text": segment.text,
+        "avg_logprob": segment.avg_logprob,
+        "no_speech_prob": segment.no_speech_prob,
+        "compression_ratio": segment.compression_ratio,
+        "words": words,
+    }
+
+
+def _segment_from_dict(data: dict) -> SimpleNamespace:
+    words = data.pop("words")
+    segment = SimpleNamespace(**data)
+    segment.words = [SimpleNamespace(**w) for w in words] if words else None
+    return segment
+
+
+def _worker_main(conn, shm_name: str, capacity: int):
+    """Entry point of the worker process: load the models, then serve decode requests."""
+    # Importing stt_handler here (not in the parent) makes this process load the
+    # models in-process, because its process name is not "MainProcess".
+    import codes.stt_handler as stt
+
+    stt._loading_thread.join()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    audio_buf = np.ndarray((capacity,), dtype=np.float32, buffer=shm.buf)
+    conn.send(("ready", list(stt.STT_MODELS), dict(stt.MODEL_MEMORY_MB), dict(stt.MODEL_CONFIGS)))
+
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            break
+        if msg[0] == "stop":
+            break
+        _, name, n_samples, audio, params = msg
+        if audio is None:
+            audio = audio_buf[:n_samples]
+        try:
+            segments, _ = stt.STT_MODELS[name].transcribe(audio, **params)
+            conn.send(("ok", [_segment_to_dict(s) for s in segments]))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+    del audio_buf
+    shm.close()
+
+
+class RemoteWhisperModel:
+    """Stand-in for a WhisperModel that lives in the worker process.
+
+    `transcribe()` has the same call shape as faster-whisper's and returns
+    `(segments, None)`, with segments as plain namespaces.
+    """
+
+    def __init__(self, client, name: str):
+        self.client = client
+        self.name = name
+
+    def transcribe(self, audio, **params):
+        return self.client.transcribe(self.name, audio, params), None
+
+
+class SttWorkerClient:
+    """Owns the STT worker process and the shared-memory audio buffer.
+
+    Audio goes through shared memory (pickled over the pipe only if it is
+    larger than the buffer); segments come back over the pipe. Requests are
+    serialised, since the worker decodes one at a time.
+    """
+
+    def __init__(self, capacity_samples: int):
+        self.capacity = capacity_samples
+        self._shm = None
+        self._audio_buf = None
+        self._conn = None
+        self._process = None
+        self._lock = threading.Lock()
+        self.models = []
+        self.memory_mb = {}
+        self.configs = {}
+
+    def start(self) -> list:
+        """Spawn the worker and block until its models are loaded; returns their names."""
+        ctx = mp.get_context("spawn")
+        self._shm = shared_memory.SharedMemory(create=True, size=self.capacity * 4)
+        self._audio_buf = np.ndarray((self.capacity,), dtype=np.float32, buffer=self._shm.buf)
+        self._conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self._shm.name, self.capacity),
+            name=WORKER_PROCESS_NAME,
+            daemon=True,
+        )
+        self._process.start()
+        # Only the worker may hold the child end, so its death shows up here as EOF
+        child_conn.close()
+        atexit.register(self.stop)
+
+        # Loading (and a first-run autotune) can take minutes, so there is no overall
+        # timeout, but a worker killed meanwhile (OOM, a crash in CTranslate2) must not hang us
+        while not self._conn.poll(STARTUP_POLL_SECONDS):
+            if not self._process.is_alive():
+                code = self._process.exitcode
+                self.stop()
+                raise RuntimeError(f"STT worker process exited with code {code} while loading models")
+        try:
+            status, self.models, self.memory_mb, self.configs = self._conn.recv()
+        except EOFError:
+            self.stop()
+            raise RuntimeError("STT worker process exited while loading models")
+        print(f"[STT] Worker process {self._process.pid} ready with models: {', '.join(self.models) or 'none'}")
+        return self.models
+
+    def model(self, name: str) -> RemoteWhisperModel:
+        return RemoteWhisperModel(self, name)
+
+    def transcribe(self, name: str, audio: np.ndarray, params: dict) -> list:
+        audio = np.asarray(audio, dtype=np.float32)
+        with self._lock:
+            if self._process is None or not self._process.is_alive():
+                raise RuntimeError("STT worker process is not running")
+            if len(audio) <= self.capacity:
+                self._audio_buf[:len(audio)] = audio
+                self._conn.send(("transcribe", name, len(audio), None, params))
+            else:
+                self._conn.send(("transcribe", name, len(audio), audio, params))
+            try:
+                status, payload = self._conn.recv()
+            except EOFError:
+                raise RuntimeError("STT worker process exited during a transcription")
+        if status != "ok":
+            raise RuntimeError(f"STT worker error: {payload}")
+        return [_segment_from_dict(s) for s in payload]
+
+    def stop(self):
+        with self._lock:
+            if self._process is not None:
+                try:
+                    self._conn.send(("stop",))
+                except (OSError, EOFError):
+                    pass
+                self._process.join(timeout=2)
+                if self._process.is_alive():
+                    self._process.terminate()
+                self._process = None
+            if self._shm is not None:
+                self._audio_buf = None
+                self._shm.close()
+                self._shm.unlink()
+                self._shm = None
@@ -4,6 +4,12 @@ import asyncio
 import simpleaudio as sa
 import threading
 import queue
+import time
+
+from codes.level_meter import TTS_LEVELS
+
+PLAYBACK_RATE = 24000
+LEVEL_INTERVAL = 0.02  # seconds per published playback level
 
 # Pipeline loaded in background thread
 pipeline = None
@@ -43,6 +49,41 @@ _loading_thread.start()
 _text_queue = queue.Queue()
 _audio_queue = queue.Queue()
 
+# Turns whose speech was cancelled; their queued items are skipped. Turn ids only grow,
+# so once a newer turn is playing, older ids are folded into _stale_before instead
+_cancelled_turns = set()
+_stale_before = 0
+_playing = None  # (turn_id, play_obj) of the chunk being played
+_playing_lock = threading.Lock()
+
+
+def _is_cancelled(turn_id) -> bool:
+    return turn_id is not None and (turn_id in _cancelled_turns or turn_id < _stale_before)
+
+
+def _prune_cancelled(active_turn):
+    """Forget cancelled turns older than `active_turn` (call with _playing_lock held).
+
+    Queues are FIFO, so by the time a newer turn plays, nothing of the
+    older ones is left to skip except stragglers, which _stale_before catches.
+    """
+    global _cancelled_turns, _stale_before
+    if active_turn is None or active_turn <= _stale_before:
+        return
+    _stale_before = active_turn
+    _cancelled_turns = {t for t in _cancelled_turns if t >= active_turn}
+
+
+def cancel_turn(turn_id):
+    """Drop all queued and playing speech tagged with `turn_id`, including completion callbacks."""
+    if turn_id is None:
+        return
+    with _playing_lock:
+        _cancelled_turns.add(turn_id)
+        if _playing is not None and _playing[0] == turn_id:
+            _playing[1].stop()
+    print(f"[TTS] Flushed speech of turn {turn_id}")
+
 def _generation_worker():
     """Worker thread to generate audio from text (Producer)."""
     while True:
@@ -51,12 +92,15 @@ def _generation_worker():
             if item is None:
                 break
             
-            text, callback, on_complete = item
+            text, callback, on_complete, turn_id = item
+            if _is_cancelled(turn_id):
+                _text_queue.task_done()
+                continue
             
             # Handle empty text (just trigger callback)
             if not text or not text.strip():
                 if on_complete:
-                    _audio_queue.put((None, None, on_complete))
+                    _audio_queue.put((None, None, on_complete, turn_id))
                 _text_queue.task_done()
                 continue
 
@@ -69,41 +113,69 @@ def _generation_worker():
                 try:
                     # Generate audio (this blocks until generation is done)
                     for _, _, audio in pipeline(text, voice="af_heart"):
+                        if _is_cancelled(turn_id):
+                            break
                         audio_np = (
                             audio.cpu().numpy() if torch.is_tensor(audio) else np.array(audio)
                         )
                         audio_int16 = (audio_np * 32767).astype(np.int16)
                         
                         # Push to audio queue for playback
-                        _audio_queue.put((audio_int16, callback, None))
+                        _audio_queue.put((audio_int16, callback, None, turn_id))
                     
                     # Signal completion for this text block
                     if on_complete:
-                        _audio_queue.put((None, None, on_complete))
+                        _audio_queue.put((None, None, on_complete, turn_id))
 
                 except Exception as e:
                     print(f"[TTS GEN ERROR] {e}")
                     # Even on error, we should probably trigger callback to avoid hanging
                     if on_complete:
-                        _audio_queue.put((None, None, on_complete))
+                        _audio_queue.put((None, None, on_complete, turn_id))
             else:
                 print("[TTS ERROR] Pipeline failed to load.")
                 if on_complete:
-                    _audio_queue.put((None, None, on_complete))
+                    _audio_queue.put((None, None, on_complete, turn_id))
                 
             _text_queue.task_done()
         except Exception as e:
             print(f"[TTS WORKER ERROR] {e}")
 
+def _level_envelope(audio_int16):
+    """Per-LEVEL_INTERVAL RMS of a chunk, normalised to 0..1."""
+    hop = int(PLAYBACK_RATE * LEVEL_INTERVAL)
+    n = len(audio_int16) // hop
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio_int16[:n * hop].astype(np.float32).reshape(n, hop)
+    return np.sqrt(np.mean(frames ** 2, axis=1)) / 32768.0
+
+
+def _publish_levels(play_obj, envelope):
+    """Publish playback levels on TTS_LEVELS in step with the audio while it plays."""
+    start = time.monotonic()
+    while play_obj.is_playing():
+        idx = int((time.monotonic() - start) / LEVEL_INTERVAL)
+        if idx >= len(envelope):
+            break
+        TTS_LEVELS.publish(float(envelope[idx]))
+        time.sleep(LEVEL_INTERVAL)
+    TTS_LEVELS.publish(0.0)
+
+
 def _playback_worker():
     """Worker thread to play audio (Consumer)."""
+    global _playing
     while True:
         try:
             item = _audio_queue.get()
             if item is None:
                 break
                 
-            audio_int16, callback, on_complete = item
+            audio_int16, callback, on_complete, turn_id = item
+            if _is_cancelled(turn_id):
+                _audio_queue.task_done()
+                continue
             
             # Handle Audio Playback
             if audio_int16 is not None:
@@ -115,10 +187,22 @@ def _playback_worker():
 
                 try:
                     wave_obj = sa.WaveObject(
-                        audio_int16, num_channels=1, bytes_per_sample=2, sample_rate=24000
+                        audio_int16, num_channels=1, bytes_per_sample=2, sample_rate=PLAYBACK_RATE
                     )
-                    play_obj = wave_obj.play()
+                    envelope = _level_envelope(audio_int16)
+                    with _playing_lock:
+                        # Checked again under the lock: a cancel_turn since the check above
+                        # would not have found this chunk playing yet
+                        if _is_cancelled(turn_id):
+                            _audio_queue.task_done()
+                            continue
+                        _prune_cancelled(turn_id)
+                        play_obj = wave_obj.play()
+                        _playing = (turn_id, play_obj)
+                    _publish_levels(play_obj, envelope)
                     play_obj.wait_done()
+                    with _playing_lock:
+                        _playing = None
                 except Exception as e:
                     print(f"[TTS PLAY ERROR] {e}")
             
@@ -150,14 +234,14 @@ async def ensure_pipeline_loaded():
         await loop.run_in_executor(None, _load_tts_pipeline)
 
 
-async def speak_text(text: str, amplitude_callback=None, on_complete=None):
+async def speak_text(text: str, amplitude_callback=None, on_complete=None, turn_id=None):
     """
     Queues text for speech. Returns immediately.
     """
-    _text_queue.put((text, amplitude_callback, on_complete))
+    _text_queue.put((text, amplitude_callback, on_complete, turn_id))
 
 
-async def speak_text_streaming(text: str, amplitude_callback=None, on_complete=None):
+async def speak_text_streaming(text: str, amplitude_callback=None, on_complete=None, turn_id=None):
     """
     Converts text to speech immediately for streaming (sentence-by-sentence).
     
@@ -165,5 +249,6 @@ async def speak_text_streaming(text: str, amplitude_callback=None, on_complete=N
         text: The text chunk to speak immediately
         amplitude_callback: Optional callback(amplitude: float) for visual feedback
         on_complete: Optional callback() when this chunk finishes playing
+        turn_id: Optional LLM turn id, so the speech can be flushed with cancel_turn()
     """
-    await speak_text(text, amplitude_callback, on_complete)
+    await speak_text(text, amplitude_callback, on_complete, turn_id)
@@ -3,7 +3,6 @@ import threading
 import time
 import math
 import random
-import queue
 from typing import Optional
 
 import customtkinter as ctk
@@ -11,6 +10,7 @@ import tkinter as tk
 from PIL import Image, ImageFilter, ImageGrab, ImageTk
 
 try:
+    import codes.level_meter
     import codes.llm_handler
     import codes.stt_handler
     import codes.tts_handler
@@ -265,11 +265,13 @@ class AISphere(tk.Frame):
 
 
 class VoiceMode:
-    def __init__(self, parent, async_loop, audio_queue: queue.Queue, mic_stop_event):
+    def __init__(self, parent, async_loop, mic_stop_event):
         print("[VoiceMode] Initializing...")
         self.parent = parent
         self.async_loop = async_loop
-        self.audio_queue = audio_queue
+        # Independent cursors: reading here never steals levels from the main window
+        self._mic_levels = codes.level_meter.MIC_LEVELS.subscribe()
+        self._tts_levels = codes.level_meter.TTS_LEVELS.subscribe()
         self.mic_stop_event = mic_stop_event
 
         self.popup_listening = False
@@ -277,6 +279,7 @@ class VoiceMode:
         self.listening = False
         self.current_state = "idle"
         self.auto_listen_active = False
+        self._llm_turn = None  # answer being generated / spoken, if any
 
         self._pulse_active = False
         self._orbit_active = False
@@ -504,13 +507,8 @@ class VoiceMode:
     def _wave_step(self):
         if not self._wave_active: return
 
-        amps = []
-        # Drain queue to get latest data, but cap it
-        try:
-            while not self.audio_queue.empty() and len(amps) < 10:
-                amps.append(self.audio_queue.get_nowait())
-        except queue.Empty:
-            pass
+        # Latest mic (listening) and playback (speaking) levels, capped
+        amps = (self._mic_levels.read_new() + self._tts_levels.read_new())[-10:]
 
         # Create organic idle movement if no audio
         if not amps:
@@ -604,6 +602,7 @@ class VoiceMode:
     def hide(self):
         self.auto_listen_active = False
         self.stop_listening()
+        self._cancel_llm_turn()
         
         self._orbit_active = False
         self._wave_active = False
@@ -657,14 +656,15 @@ class VoiceMode:
 
     def start_listening(self):
         if self.stt_worker_active: return
+        # Talking over the answer stops it
+        self._cancel_llm_turn()
         
         self.popup_listening = True
         self.stt_worker_active = True
         self.mic_stop_event.clear()
         
-        # Clear old audio data
-        with self.audio_queue.mutex:
-            self.audio_queue.queue.clear()
+        # Skip levels from before this turn
+        self._mic_levels.read_new()
             
         self._set_state("listening")
         threading.Thread(target=self._run_mic_logic, daemon=True).start()
@@ -691,7 +691,6 @@ class VoiceMode:
             # Bridge to async world
             future = asyncio.run_coroutine_threadsafe(
                 codes.stt_handler.whisper_streaming_advanced(
-                    amplitude_queue=self.audio_queue,
                     stop_event=self.mic_stop_event,
                     partial_callback=on_partial,
                     final_callback=on_final
@@ -720,6 +719,11 @@ class VoiceMode:
     # ---------------------------
     # LLM & TTS Logic
     # ---------------------------
+    def _cancel_llm_turn(self):
+        turn, self._llm_turn = self._llm_turn, None
+        if turn is not None:
+            turn.cancel()
+
     def _run_llm_logic(self, prompt):
         buffer = ""
         import re
@@ -736,38 +740,46 @@ class VoiceMode:
                 for part in parts[:-1]:
                     if part.strip():
                         self._set_state("speaking")
-                        self._speak_chunk(part.strip())
+                        self._speak_chunk(part.strip(), turn_id=turn.id)
                 # Keep the last part (incomplete sentence)
                 buffer = parts[-1]
 
+        turn = codes.llm_handler.query_llm(prompt, stream_callback=on_stream)
+        # Cancelling the turn also drops its queued and playing speech
+        turn.add_cancel_callback(lambda: codes.tts_handler.cancel_turn(turn.id))
+        self._cancel_llm_turn()
+        self._llm_turn = turn
         try:
-            future = asyncio.run_coroutine_threadsafe(
-                codes.llm_handler.query_llm(prompt, stream_callback=on_stream),
-                self.async_loop
-            )
+            future = asyncio.run_coroutine_threadsafe(turn.run(), self.async_loop)
             full_response, _ = future.result()
             
             # Speak remaining text
-            if buffer.strip():
-                self._speak_chunk(buffer.strip())
+            if buffer.strip() and not turn.cancelled:
+                self._speak_chunk(buffer.strip(), turn_id=turn.id)
                 
         except Exception as e:
             print(f"[LLM] Error: {e}")
+
+        if turn.cancelled:
+            # Whoever cancelled the turn (closing, or a new question) owns the state now
+            return
             
         # Finished
         self._safe_ui_update(self.transcription_label.configure, text="")
         
         # Callback to restart listening ONLY after audio finishes
         def on_speech_done():
+            if self._llm_turn is turn:
+                self._llm_turn = None
             self._safe_ui_update(self._set_state, "idle")
             if self.auto_listen_active:
                 # Small delay to ensure mic doesn't catch echo
                 self.parent.after(500, lambda: self._safe_ui_update(self._start_auto_listening))
 
         # Send empty chunk to trigger callback after all audio is played
-        self._speak_chunk("", on_finish=on_speech_done)
+        self._speak_chunk("", on_finish=on_speech_done, turn_id=turn.id)
 
-    def _speak_chunk(self, text, on_finish=None):
+    def _speak_chunk(self, text, on_finish=None, turn_id=None):
         """Invokes TTS and updates visuals."""
         def amp_cb(a):
             self._safe_ui_update(self.popup_sphere.set_amplitude, a)
@@ -775,7 +787,9 @@ class VoiceMode:
         try:
             # Fire and forget (TTS queue handles serialization)
             asyncio.run_coroutine_threadsafe(
-                codes.tts_handler.speak_text_streaming(text, amplitude_callback=amp_cb, on_complete=on_finish),
+                codes.tts_handler.speak_text_streaming(
+                    text, amplitude_callback=amp_cb, on_complete=on_finish, turn_id=turn_id
+                ),
                 self.async_loop
             )
         except Exception:
@@ -8,8 +8,6 @@ warnings.filterwarnings("ignore", category=FutureWarning)
 warnings.filterwarnings("ignore", category=UserWarning)
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 
-from codes.gui import VoiceChatGUI
-
 
 def run_asyncio_loop(loop):
     asyncio.set_event_loop(loop)
@@ -20,6 +18,9 @@ def run_asyncio_loop(loop):
 
 
 if __name__ == "__main__":
+    # Imported here so processes spawned by the app (e.g. the STT worker) don't load the GUI and TTS
+    from codes.gui import VoiceChatGUI
+
     main_loop = asyncio.new_event_loop()
     loop_thread = threading.Thread(
         target=run_asyncio_loop, args=(main_loop,), daemon=True
@@ -0,0 +1,74 @@
+import pytest
+
+from codes.endpointer import MAX_HANGOVER_MS, MIN_HANGOVER_MS, AdaptiveEndpointer
+
+FRAME_MS = 20
+
+
+def talk(endpointer, speech_ms, pause_ms=0):
+    """Feed `speech_ms` of speech, then `pause_ms` of silence."""
+    for _ in range(int(speech_ms / FRAME_MS)):
+        endpointer.update(True)
+    for _ in range(int(pause_ms / FRAME_MS)):
+        endpointer.update(False)
+
+
+@pytest.mark.parametrize("speech_ms, hangover", [(1000, 640), (3000, 800), (7000, 960)])
+def test_hangover_scales_with_utterance_length(speech_ms, hangover):
+    endpointer = AdaptiveEndpointer(FRAME_MS, aggressiveness=1)
+    talk(endpointer, speech_ms)
+    assert endpointer.hangover_ms() == pytest.approx(hangover)
+
+
+def test_hangover_covers_the_users_typical_pause():
+    endpointer = AdaptiveEndpointer(FRAME_MS, aggressiveness=1)
+    for _ in range(6):
+        talk(endpointer, 400, pause_ms=1200)
+    talk(endpointer, 400)  # the last pause is only recorded once speech resumes
+    assert endpointer.hangover_ms() == pytest.approx(1200 * 1.1)
+
+    # Pause statistics survive into the next turn
+    endpointer.begin_turn()
+    talk(endpointer, 3000)
+    assert endpointer.hangover_ms() == pytest.approx(1200 * 1.1)
+
+
+def test_flicker_is_not_a_pause():
+    endpointer = AdaptiveEndpointer(FRAME_MS, aggressiveness=1)
+    for _ in range(6):
+        talk(endpointer, 400, pause_ms=60)
+    assert endpointer._pause_p90() == 0.0
+
+
+@pytest.mark.parametrize("text, factor", [
+    ("turn on the light.", 0.6),
+    ("what time is it?", 0.6),
+    ("I want pasta,", 1.3),
+    ("I want pasta and", 1.3),
+    ("I want pasta", 1.0),
+])
+def test_trailing_text_adjusts_hangover(text, factor):
+    endpointer = AdaptiveEndpointer(FRAME_MS, aggressiveness=1)
+    talk(endpointer, 3000)
+    endpointer.set_partial_text(text)
+    assert endpointer.hangover_ms() == pytest.approx(800 * factor)
+
+
+def test_hangover_is_clamped():
+    snappy = AdaptiveEndpointer(FRAME_MS, aggressiveness=3)
+    talk(snappy, 500)
+    snappy.set_partial_text("yes.")
+    assert snappy.hangover_ms() == MIN_HANGOVER_MS
+
+    patient = AdaptiveEndpointer(FRAME_MS, aggressiveness=0)
+    talk(patient, 7000)
+    patient.set_partial_text("and")
+    assert patient.hangover_ms() == MAX_HANGOVER_MS
+
+
+def test_turn_ends_once_silence_exceeds_the_hangover():
+    endpointer = AdaptiveEndpointer(FRAME_MS, aggressiveness=1)
+    talk(endpointer, 1000)
+    ended = [endpointer.update(False) for _ in range(40)]
+    assert ended.index(True) == 640 // FRAME_MS
+    assert endpointer.metrics()["hangover_ms"] == 640
@@ -0,0 +1,43 @@
+import time
+
+from codes.level_meter import LevelMeter
+
+
+def test_reader_sees_only_new_levels():
+    meter = LevelMeter(capacity=8)
+    meter.publish(0.1)
+    reader = meter.subscribe()
+    assert reader.read_new() == []
+    meter.publish(0.2)
+    meter.publish(0.3)
+    assert reader.read_new() == [0.2, 0.3]
+    assert reader.read_new() == []
+
+
+def test_reader_lapped_by_the_writer_gets_the_newest_ring():
+    meter = LevelMeter(capacity=8)
+    reader = meter.subscribe()
+    for i in range(20):
+        meter.publish(i / 100)
+    # One slot of slack is kept for a writer that laps the reader mid-read
+    assert reader.read_new() == [i / 100 for i in range(13, 20)]
+    meter.publish(0.5)
+    assert reader.read_new() == [0.5]
+
+
+def test_readers_do_not_race_each_other():
+    meter = LevelMeter(capacity=8)
+    first, second = meter.subscribe(), meter.subscribe()
+    meter.publish(0.4)
+    assert first.read_new() == [0.4]
+    assert second.read_new() == [0.4]
+
+
+def test_latest_across_the_wrap_point_and_by_age():
+    meter = LevelMeter(capacity=4)
+    now = time.monotonic()
+    for i in range(6):
+        meter.publish(i / 10, timestamp=now - 10 + i)
+    assert meter.latest(3) == [0.3, 0.4, 0.5]
+    meter.publish(0.9)
+    assert meter.latest(3, max_age=1.0) == [0.9]
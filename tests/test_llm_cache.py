@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("openai")
+
+import codes.llm_handler as llm
+
+
+@pytest.mark.parametrize("cached, asked, hit", [
+    ("turn on the kitchen light", "turn off the kitchen light", False),
+    ("what is the capital of austria", "what is the capital of australia", False),
+    ("set a timer for 10 minutes", "set a timer for 15 minutes", False),
+    ("tell me a joke", "tell me a joke please", True),
+])
+def test_near_hits_need_the_same_words(cached, asked, hit):
+    cache = llm.ResponseCache(path=None, near_threshold=0.8)
+    cache.put(cached, "ctx", "answer", "OpenRouter")
+    entry, match = cache.get(asked, "ctx")
+    assert (match == "near") is hit
+
+
+def _conversation(user, assistant):
+    conversation = llm.ConversationStore()
+    conversation.add_turn(user, assistant)
+    return conversation
+
+
+def test_follow_up_is_keyed_on_the_previous_turn():
+    weather = _conversation("what's the weather today?", "Sunny.")
+    films = _conversation("recommend a film", "Try Arrival.")
+    for follow_up in ("why?", "what about tomorrow?", "is it any good"):
+        assert llm.ResponseCache.context_hash(weather, follow_up) != llm.ResponseCache.context_hash(films, follow_up)
+
+
+def test_repeated_question_hits_after_an_unrelated_turn():
+    cache = llm.ResponseCache(path=None)
+    prompt = "tell me a joke about programmers"
+    earlier = _conversation("what's the weather today?", "Sunny and warm, enjoy it!")
+    cache.put(prompt, llm.ResponseCache.context_hash(earlier, prompt), "A joke.", "OpenRouter")
+    # Different previous turn, and a differently sampled assistant reply
+    later = _conversation("recommend a film", "Try Arrival, it's great.")
+    entry, match = cache.get(prompt, llm.ResponseCache.context_hash(later, prompt))
+    assert match == "exact" and entry["response"] == "A joke."
@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("openai")
+
+import codes.llm_handler as llm
+
+
+def test_trim_folds_old_turns_into_a_summary_below_target():
+    store = llm.ConversationStore(token_budget=200)
+    system = store.build_messages("hi")[0]
+    trimmed = False
+    for i in range(12):
+        store.add_turn(f"Question number {i} about something?", f"Answer {i}. " + "More detail here. " * 8)
+        if store.evicted_turns and not trimmed:
+            trimmed = True
+            # Trimming goes well below the budget, so several turns fit before the next trim
+            assert store._history_tokens() <= 200 * llm.CONTEXT_TRIM_TARGET
+        assert store._history_tokens() <= 200
+    assert trimmed
+    assert store.summary_lines[-1].startswith(f"- User: Question number {store.evicted_turns - 1}")
+
+    messages = store.build_messages("next")
+    # The system prompt stays byte-identical, so providers can keep caching it
+    assert messages[0] == system
+    assert messages[0]["content"].encode() == llm.CHARACTER_PERSONALITY.encode()
+    assert messages[1]["content"].startswith("Summary of the earlier conversation:")
+
+
+def test_messages_extend_the_previous_request_between_trims():
+    store = llm.ConversationStore(token_budget=10_000)
+    store.add_turn("hello", "Hi there!")
+    before = store.build_messages("how are you?")
+    store.add_turn("how are you?", "Great, thanks.")
+    after = store.build_messages("tell me a joke")
+    assert after[:len(before)] == before
+
+
+def test_latest_turn_is_kept_even_over_budget():
+    store = llm.ConversationStore(token_budget=10)
+    store.add_turn("a very long question " * 20, "a very long answer " * 20)
+    assert len(store.turns) == 1
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("openai")
+
+from openai import AsyncOpenAI
+
+import codes.llm_handler as llm
+from codes.mock_llm_server import MockScript, start_mock_server
+
+ANSWER = "Sure thing! This is the mock server talking, so this answer is canned."
+FAST = {"ttft_ms": 20, "tokens_per_second": 0, "response": ANSWER}
+
+
+@pytest.fixture
+def mock_providers(monkeypatch):
+    """Point both providers at mock servers; returns a function taking their request scripts."""
+    servers = []
+
+    def setup(primary=(), fallback=(), primary_defaults=None, fallback_defaults=None):
+        scripts = {}
+        for name, requests, defaults in (
+            ("OpenRouter", primary, primary_defaults),
+            ("Ollama", fallback, fallback_defaults),
+        ):
+            script = MockScript(dict(FAST, **(defaults or {})), list(requests))
+            server = start_mock_server(script)
+            servers.append(server)
+            client = AsyncOpenAI(
+                base_url=f"http://127.0.0.1:{server.server_address[1]}/v1",
+                api_key="mock",
+                http_client=llm._make_http_client(name),
+                max_retries=0,
+            )
+            monkeypatch.setattr(llm, "primary_client" if name == "OpenRouter" else "fallback_client", client)
+            scripts[name] = script
+        return scripts
+
+    monkeypatch.setattr(llm, "_HTTP_CLIENTS", {})
+    monkeypatch.setattr(llm, "response_cache", None)
+    monkeypatch.setattr(llm, "_ollama_task", None)
+    monkeypatch.setattr(llm, "HEDGE_MS", 0)
+    monkeypatch.setattr(llm, "PROVIDER_HEALTH", {
+        "OpenRouter": llm.ProviderHealth("OpenRouter"),
+        "Ollama": llm.ProviderHealth("Ollama"),
+    })
+    llm.reset_conversation("mock")
+    yield setup
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+async def ask(prompt="hi"):
+    """One streamed turn; returns (text, provider, streamed text)."""
+    streamed = []
+    text, provider = await llm.query_llm(prompt, stream_callback=streamed.append, session_id="mock")
+    return text, provider, "".join(streamed)
+
+
+def ask_once(prompt="hi"):
+    return asyncio.run(ask(prompt))
+
+
+def test_disconnect_mid_stream_is_continued_on_the_fallback(mock_providers):
+    scripts = mock_providers(primary=[{"disconnect_after_tokens": 3}])
+    text, provider, streamed = ask_once()
+    assert provider == "Ollama"
+    assert llm.LAST_TURN_STATS["failover"]["from"] == "OpenRouter"
+    # The fallback continued the answer instead of starting over
+    assert streamed == text == ANSWER
+    assert scripts["OpenRouter"].stats["disconnects"] == 1
+
+
+def test_stalled_stream_fails_over(mock_providers, monkeypatch):
+    monkeypatch.setattr(llm, "STALL_MS", 200)
+    mock_providers(primary=[{"stall_after_tokens": 3, "stall_ms": 3000}])
+    start = time.perf_counter()
+    text, provider, streamed = ask_once()
+    assert provider == "Ollama"
+    assert llm.LAST_TURN_STATS["failover"]["from"] == "OpenRouter"
+    assert streamed == ANSWER
+    assert time.perf_counter() - start < 2
+
+
+def test_rate_limit_puts_the_provider_on_cooldown(mock_providers):
+    scripts = mock_providers(primary=[{"status": 429, "retry_after": 30}])
+
+    async def two_turns():
+        assert (await ask())[1] == "Ollama"
+        cooldown = llm.provider_health()["OpenRouter"]["cooldown_seconds"]
+        assert 25 < cooldown <= 30
+        # The next turn skips OpenRouter without a request
+        assert (await ask("again"))[1] == "Ollama"
+
+    asyncio.run(two_turns())
+    assert "OpenRouter" in llm.get_routing_log()[-1]["skipped"]
+    assert scripts["OpenRouter"].stats["requests"] == 1
+
+
+def test_slow_first_token_is_hedged(mock_providers, monkeypatch):
+    monkeypatch.setattr(llm, "HEDGE_MS", 100)
+    mock_providers(primary_defaults={"ttft_ms": 2000})
+    start = time.perf_counter()
+    text, provider, streamed = ask_once()
+    assert provider == "Ollama"
+    assert llm.LAST_TURN_STATS["hedged"]
+    assert streamed == ANSWER
+    assert time.perf_counter() - start < 1.5
+
+
+def test_cancelled_turn_leaves_no_history(mock_providers):
+    mock_providers(primary_defaults={"tokens_per_second": 10})
+
+    async def run():
+        turn = llm.query_llm("hi", stream_callback=lambda text: turn.cancel(), session_id="mock")
+        return await turn
+
+    assert asyncio.run(run()) == llm.CANCELLED_RESULT
+    assert llm.get_conversation("mock").turns == []
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("openai")
+
+import codes.llm_handler as llm
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    """Fake OpenRouter/Ollama: `outcomes[name]` lists texts, exceptions or async fns(stream_callback)."""
+    outcomes = {"OpenRouter": [], "Ollama": []}
+    calls = []
+    primary, fallback = object(), object()
+    names = {id(primary): "OpenRouter", id(fallback): "Ollama"}
+
+    async def fake_complete(client, model, messages, stream_callback=None, extra_body=None):
+        name = names[id(client)]
+        calls.append(name)
+        outcome = outcomes[name].pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        if callable(outcome):
+            return await outcome(stream_callback)
+        return outcome
+
+    monkeypatch.setattr(llm, "primary_client", primary)
+    monkeypatch.setattr(llm, "fallback_client", fallback)
+    monkeypatch.setattr(llm, "_complete", fake_complete)
+    monkeypatch.setattr(llm, "response_cache", None)
+    monkeypatch.setattr(llm, "HEDGE_MS", 2000)
+    monkeypatch.setattr(llm, "PROVIDER_HEALTH", {
+        "OpenRouter": llm.ProviderHealth("OpenRouter"),
+        "Ollama": llm.ProviderHealth("Ollama"),
+    })
+    llm.reset_conversation("test")
+    return outcomes, calls
+
+
+def test_unlaunched_half_open_provider_keeps_its_trial(providers):
+    outcomes, calls = providers
+    ollama = llm.PROVIDER_HEALTH["Ollama"]
+    ollama.state = "open"
+    ollama.open_until = time.monotonic() - 1  # due for a half-open trial
+
+    # OpenRouter answers before the hedge deadline, so Ollama is never launched
+    outcomes["OpenRouter"].append("first answer")
+    assert asyncio.run(llm._run_query("hi", session_id="test")) == ("first answer", "OpenRouter")
+    assert calls == ["OpenRouter"]
+    assert not ollama.trial_in_flight
+
+    # The next OpenRouter failure must still fall back to Ollama's trial request
+    outcomes["OpenRouter"].append(RuntimeError("boom"))
+    outcomes["Ollama"].append("fallback answer")
+    assert asyncio.run(llm._run_query("again", session_id="test")) == ("fallback answer", "Ollama")
+    assert calls == ["OpenRouter", "OpenRouter", "Ollama"]
+    assert ollama.state == "closed"
+
+
+def test_loser_that_failed_as_the_race_was_won_is_not_a_reserve(providers, monkeypatch):
+    outcomes, calls = providers
+    monkeypatch.setattr(llm, "HEDGE_MS", 20)
+    first_token = asyncio.Event()
+
+    async def primary(stream_callback):
+        await asyncio.sleep(0.05)  # slow enough to get hedged
+        stream_callback("Hello")
+        first_token.set()
+        await asyncio.sleep(0.05)
+        raise RuntimeError("broke off")
+
+    async def fallback(stream_callback):
+        await first_token.wait()  # fails in the same wakeup in which the primary wins
+        raise RuntimeError("down")
+
+    outcomes["OpenRouter"].append(primary)
+    outcomes["Ollama"].append(fallback)
+    text, provider = asyncio.run(llm._run_query("hi", stream_callback=lambda t: None, session_id="test"))
+    assert provider == "None"
+    # The failed fallback must not be relaunched to continue the broken answer
+    assert calls == ["OpenRouter", "Ollama"]
+
+
+def test_continuation_that_restates_the_prefix_is_stripped():
+    continuation = llm._ContinuationFilter("Sure thing! This is")
+    out = [continuation.feed(t) for t in ("Sure ", "thing! ", "This is", " the rest", " of it.")]
+    assert "".join(out) + continuation.flush() == " the rest of it."
+
+
+def test_real_continuation_passes_through():
+    continuation = llm._ContinuationFilter("Sure thing! This is")
+    out = [continuation.feed(t) for t in (" the", " rest", " of it, said in more than forty characters.")]
+    assert "".join(out) + continuation.flush() == " the rest of it, said in more than forty characters."
+
+
+def test_short_continuation_is_flushed_at_the_end():
+    continuation = llm._ContinuationFilter("Sure thing! This is")
+    assert continuation.feed(" ok.") == ""
+    assert continuation.flush() == " ok."